@@ -0,0 +1,221 @@
+"""Live crawler for the bill, hansard, order paper and votes listings on nass.gov.ng.
+
+The listing pages are DataTables tables filled from JSON endpoints
+(`/documents/bill_track/` and so on), so the crawler pages through those
+endpoints directly instead of parsing saved HTML. It reuses one pooled
+aiohttp session and crawls the four listings concurrently. Requests to a
+host are spaced by `HostRateLimiter` and capped in number. Each page is
+fetched with the ETag/Last-Modified validators of the previous crawl.
+
+Rows come back as `[title markup, column..., doc_id]`, with the doc id at index 6.
+They become the same records `scrape_page` builds. New documents show up
+at the head of a listing, so an incremental crawl stops once a whole page
+in a row is made of documents it already knows; an unchanged (304) page
+counts as one. Pass `full=True` to page through everything.
+"""
+import asyncio
+import contextlib
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from bs4 import BeautifulSoup
+
+BASE_URL = "https://nass.gov.ng"
+PAGE_SIZE = 100
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+class Listing:
+    """A DataTables listing: its JSON endpoint, the path its links use and the columns after the title."""
+
+    def __init__(self, doc_type, endpoint, link_path, columns):
+        self.doc_type = doc_type
+        self.endpoint = endpoint
+        self.link_path = link_path
+        self.columns = columns
+
+
+LISTINGS = {
+    "bills": Listing(
+        "bills", "/documents/bill_track/", "/documents/bill/",
+        ("chamber", "first_reading", "second_reading", "commitee_referred", "third_reading"),
+    ),
+    "hansard": Listing(
+        "hansard", "/documents/hansard_track/", "/documents/download/",
+        ("document_date", "chamber", "parliament", "session"),
+    ),
+    "order_papers": Listing(
+        "order_papers", "/documents/order_paper_track/", "/documents/download/",
+        ("document_date", "chamber", "parliament", "session"),
+    ),
+    "votes_and_proceedings": Listing(
+        "votes_and_proceedings", "/documents/votes_track/", "/documents/download/",
+        ("document_date", "chamber", "parliament", "session"),
+    ),
+}
+
+
+def row_to_document(listing, row, base_url=BASE_URL):
+    """Turns a DataTables row into the record `scrape_page` stores for the same document."""
+    doc_id = str(row[6])
+    url = f"{base_url}{listing.link_path}{doc_id}"
+    metadata = {column: str(value or "") for column, value in zip(listing.columns, row[1:])}
+    if listing.doc_type == "bills":
+        metadata["download_url"] = f"{base_url}/documents/billdownload/{doc_id}.pdf"
+    else:
+        metadata["download_url"] = url
+    metadata["doc_id"] = doc_id
+    # the title cell is the markup the page renders inside the document's link
+    title = str(row[0] or "")
+    if "<" in title:
+        title = BeautifulSoup(title, "html.parser").get_text(" ", strip=True)
+    return {"title": title, "url": url, "metadata": metadata, "doc_type": listing.doc_type}
+
+
+class HostRateLimiter:
+    """Spaces requests to each host at least `1 / requests_per_s` apart, with at most `max_in_flight` open."""
+
+    def __init__(self, requests_per_s=2.0, max_in_flight=4):
+        self.interval = 1.0 / requests_per_s
+        self.max_in_flight = max_in_flight
+        self._semaphores = {}
+        self._locks = {}
+        self._next = {}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, host):
+        semaphore = self._semaphores.setdefault(host, asyncio.Semaphore(self.max_in_flight))
+        async with semaphore:
+            async with self._locks.setdefault(host, asyncio.Lock()):
+                wait = self._next.get(host, 0.0) - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next[host] = time.monotonic() + self.interval
+            yield
+
+
+class Crawler:
+    """Pages through the listings, keeping the validators each page was last served with.
+
+    Arguments:
+        validators: `{page key: {"etag": ..., "last_modified": ...}}` from the
+            previous crawl, updated in place; persist it between crawls.
+        requests_per_s, max_in_flight: Per-host politeness limits.
+        max_retries: Retries of a 429 or 5xx, honouring any Retry-After header.
+    """
+
+    def __init__(
+        self, base_url=BASE_URL, page_size=PAGE_SIZE, validators=None, requests_per_s=2.0, max_in_flight=4,
+        max_retries=3, backoff=1.0, timeout=30.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.host = urlsplit(self.base_url).netloc
+        self.page_size = page_size
+        self.validators = {} if validators is None else validators
+        self.limiter = HostRateLimiter(requests_per_s, max_in_flight)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.stats = Counter()
+
+    async def fetch_page(self, session, listing, start):
+        """Returns the page's JSON, or None if it has not changed since the validators were stored."""
+        key = f"{listing.endpoint}?start={start}&length={self.page_size}"
+        headers = {}
+        cached = self.validators.get(key, {})
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        params = {"draw": 1, "start": start, "length": self.page_size}
+
+        for attempt in range(self.max_retries + 1):
+            async with self.limiter.slot(self.host):
+                async with session.get(self.base_url + listing.endpoint, params=params, headers=headers) as response:
+                    self.stats["requests"] += 1
+                    if response.status == 304:
+                        self.stats["not_modified"] += 1
+                        return None
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        self.stats["retried"] += 1
+                        retry_after = response.headers.get("Retry-After", "")
+                        delay = float(retry_after) if retry_after.isdigit() else self.backoff * 2 ** attempt
+                    else:
+                        response.raise_for_status()
+                        payload = await response.json(content_type=None)
+                        self.validators[key] = {
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                        }
+                        return payload
+            await asyncio.sleep(delay)
+
+    def _documents(self, listing, payload):
+        return [row_to_document(listing, row, self.base_url) for row in payload.get("data", [])]
+
+    async def crawl_listing(self, session, listing, known_ids=(), full=False):
+        """Returns the listing's documents that are not in `known_ids`."""
+        known_ids = set(known_ids)
+        if full or not known_ids:
+            # nothing to stop at: read the size from the first page and fetch the rest concurrently
+            first = await self.fetch_page(session, listing, 0)
+            if first is None:
+                first = await self._refetch(session, listing, 0)
+            total = first.get("recordsFiltered", first.get("recordsTotal", 0))
+            pages = await asyncio.gather(*(
+                self._refetch(session, listing, start) for start in range(self.page_size, total, self.page_size)
+            ))
+            documents = [document for payload in (first, *pages) for document in self._documents(listing, payload)]
+            return [document for document in documents if document["metadata"]["doc_id"] not in known_ids]
+
+        documents, known_streak, start = [], 0, 0
+        while known_streak < self.page_size:
+            payload = await self.fetch_page(session, listing, start)
+            if payload is None:
+                known_streak += self.page_size
+                start += self.page_size
+                continue
+            page = self._documents(listing, payload)
+            for document in page:
+                if document["metadata"]["doc_id"] in known_ids:
+                    known_streak += 1
+                else:
+                    known_streak = 0
+                    documents.append(document)
+            if len(page) < self.page_size:
+                break
+            start += self.page_size
+        if known_streak >= self.page_size:
+            self.stats["stopped_early"] += 1
+        return documents
+
+    async def _refetch(self, session, listing, start):
+        # a full crawl needs the rows, so ask again without validators if the page was unchanged
+        payload = await self.fetch_page(session, listing, start)
+        if payload is None:
+            self.validators.pop(f"{listing.endpoint}?start={start}&length={self.page_size}", None)
+            payload = await self.fetch_page(session, listing, start)
+        return payload
+
+    async def crawl(self, listings=None, known_ids=None, full=False):
+        """Crawls the listings concurrently; returns `{doc_type: [new documents]}`."""
+        import aiohttp
+
+        listings = list(listings or LISTINGS.values())
+        known_ids = known_ids or {}
+        connector = aiohttp.TCPConnector(limit_per_host=self.limiter.max_in_flight)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            results = await asyncio.gather(*(
+                self.crawl_listing(session, listing, known_ids.get(listing.doc_type, ()), full)
+                for listing in listings
+            ))
+        return {listing.doc_type: documents for listing, documents in zip(listings, results)}
+
+
+def crawl(known_ids=None, validators=None, full=False, base_url=BASE_URL, **crawler_kwargs):
+    """Runs a `Crawler` to completion; returns `({doc_type: [new documents]}, stats)`."""
+    crawler = Crawler(base_url=base_url, validators=validators, **crawler_kwargs)
+    documents = asyncio.run(crawler.crawl(known_ids=known_ids, full=full))
+    return documents, dict(crawler.stats)
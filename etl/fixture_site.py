@@ -0,0 +1,188 @@
+"""Local stand-in for the nass.gov.ng listings, for checking `crawler` without touching the real site.
+
+Serves the four DataTables endpoints from the rows of the saved pages in
+`webpages/`, with ETags, Last-Modified and 304s, and answers a fraction of
+requests with a 429. Then it crawls itself three times: cold, again with
+nothing changed, and after new documents are added to the head of each
+listing, failing if any title keeps the cells' markup. For each crawl it
+reports the requests, 304s, retries, new documents, wall time and the
+smallest gap between two requests:
+
+    cd etl && python fixture_site.py --requests-per-s 20 --throttle-rate 0.05
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from email.utils import formatdate
+from pathlib import Path
+
+from aiohttp import web
+from bs4 import BeautifulSoup
+
+import crawler
+
+WEBPAGE_DIR = Path(__file__).parent / "webpages"
+WEBPAGES = {
+    "bills": "National Assembly _ Federal Republic of Nigeria.html",
+    "hansard": "National Assembly _ Federal Republic of Nigeria-hansard.html",
+    "order_papers": "National Assembly _ Federal Republic of Nigeria - order_paper.html",
+    "votes_and_proceedings": "National Assembly _ Federal Republic of Nigeria - votes_proceding.html",
+}
+
+
+def load_rows(path):
+    """Returns the table of a saved listing page as DataTables rows, `[title markup, columns..., doc_id]`."""
+    with open(path) as html_file:
+        soup = BeautifulSoup(html_file, "html.parser")
+    table = soup.find("table", attrs={"class": "table table-striped table-bordered dataTable"})
+    rows = []
+    for tr in table.find("tbody").find_all("tr"):
+        td = tr.find_all("td")
+        # the site sends the title cell as the markup inside its link, not as text
+        columns = [td[0].a.decode_contents()] + [cell.text for cell in td[1:6]]
+        columns += [""] * (6 - len(columns))
+        rows.append(columns + [td[0].find("a")["href"].split("/")[-1]])
+    return rows
+
+
+class FixtureSite:
+    """DataTables endpoints over in-memory rows, newest first, logging when each request arrived.
+
+    Arguments:
+        throttle_rate: Fraction of requests answered with a 429 and `Retry-After: 0`.
+    """
+
+    def __init__(self, rows, throttle_rate=0.0, seed=0):
+        self.rows = rows
+        self.modified = {doc_type: time.time() for doc_type in rows}
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.request_times = []
+
+    def add_documents(self, doc_type, n):
+        """Prepends `n` new rows to a listing, as the site does when documents are published."""
+        last_id = max(int(row[-1]) for listings in self.rows.values() for row in listings)
+        new_rows = [
+            [f"New document {last_id + i}", "2023-06-01", "Senate", "9th Assembly", "4th Session", "", str(last_id + i)]
+            for i in range(n, 0, -1)
+        ]
+        self.rows[doc_type] = new_rows + self.rows[doc_type]
+        self.modified[doc_type] = time.time()
+
+    def handler(self, doc_type):
+        async def listing(request):
+            self.request_times.append(time.monotonic())
+            if self.rng.random() < self.throttle_rate:
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            start = int(request.query.get("start", 0))
+            length = int(request.query.get("length", 10))
+            rows = self.rows[doc_type]
+            body = json.dumps({
+                "draw": int(request.query.get("draw", 1)),
+                "recordsTotal": len(rows),
+                "recordsFiltered": len(rows),
+                "data": rows[start:start + length],
+            })
+            headers = {
+                "ETag": f'"{hashlib.sha1(body.encode()).hexdigest()}"',
+                "Last-Modified": formatdate(self.modified[doc_type], usegmt=True),
+            }
+            if request.headers.get("If-None-Match") == headers["ETag"]:
+                return web.Response(status=304, headers=headers)
+            return web.Response(text=body, content_type="application/json", headers=headers)
+
+        return listing
+
+    def min_gap(self, since=0):
+        times = self.request_times[since:]
+        return min((b - a for a, b in zip(times, times[1:])), default=0.0)
+
+
+def make_app(site):
+    app = web.Application()
+    for doc_type, listing in crawler.LISTINGS.items():
+        app.router.add_get(listing.endpoint, site.handler(doc_type))
+    return app
+
+
+def serve_in_background(site):
+    """Runs the fixture site on a daemon thread and returns its base URL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(make_app(site))
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="fixture-site", daemon=True).start()
+    ready.wait(10)
+    return f"http://127.0.0.1:{port}"
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests-per-s", type=float, default=20.0, help="Crawler's per-host request rate.")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Crawler's per-host concurrent requests.")
+    parser.add_argument("--page-size", type=int, default=crawler.PAGE_SIZE, help="Rows asked for per page.")
+    parser.add_argument("--throttle-rate", type=float, default=0.05, help="Fraction of requests answered with 429.")
+    parser.add_argument("--new-documents", type=int, default=3, help="Documents added to each listing before the last crawl.")
+    return parser
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    site = FixtureSite(
+        {doc_type: load_rows(WEBPAGE_DIR / name) for doc_type, name in WEBPAGES.items()}, args.throttle_rate
+    )
+    base_url = serve_in_background(site)
+    known_ids, validators, failed = {}, {}, []
+
+    for name in ("cold", "unchanged", "new_documents"):
+        if name == "new_documents":
+            for doc_type in site.rows:
+                site.add_documents(doc_type, args.new_documents)
+        since = len(site.request_times)
+        start = time.perf_counter()
+        documents, stats = crawler.crawl(
+            known_ids, validators, base_url=base_url, page_size=args.page_size,
+            requests_per_s=args.requests_per_s, max_in_flight=args.max_in_flight, backoff=0.0,
+        )
+        seconds = time.perf_counter() - start
+        found = {doc_type: len(docs) for doc_type, docs in documents.items()}
+        print(
+            f"{name}: {stats.get('requests', 0)} requests, {stats.get('not_modified', 0)} not modified, "
+            f"{stats.get('retried', 0)} retried, {sum(found.values())} new documents {found}, {seconds:.2f}s, "
+            f"min gap {site.min_gap(since) * 1000:.1f}ms"
+        )
+        expected = {
+            "cold": {doc_type: len(rows) for doc_type, rows in site.rows.items()},
+            "unchanged": {doc_type: 0 for doc_type in site.rows},
+            "new_documents": {doc_type: args.new_documents for doc_type in site.rows},
+        }[name]
+        if found != expected:
+            failed.append(f"{name}: expected {expected}, found {found}")
+        marked_up = [document["title"] for docs in documents.values() for document in docs if "<" in document["title"]]
+        if marked_up:
+            failed.append(f"{name}: {len(marked_up)} titles kept markup, e.g. {marked_up[0]!r}")
+        for doc_type, docs in documents.items():
+            known_ids.setdefault(doc_type, set()).update(document["metadata"]["doc_id"] for document in docs)
+
+    for failure in failed:
+        print(f"FAILED {failure}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
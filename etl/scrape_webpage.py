@@ -8,7 +8,7 @@ import modal
 from pathlib import Path
 from dotenv import load_dotenv
 import pymongo
-from pymongo import InsertOne, UpdateOne
+from pymongo import UpdateOne
 
 load_dotenv()
 
@@ -26,7 +26,8 @@ image = modal.image.Image.debian_slim(  # we start from a lightweight linux dist
     "pymongo[srv]",
     "beautifulsoup4",
     "fsspec",
-    "s3fs"
+    "s3fs",
+    "aiohttp",
 )
 
 # we define a Stub to hold all the pieces of our app
@@ -39,7 +40,10 @@ stub = modal.stub.Stub(
         modal.secret.Secret.from_name("my-aws-secret"),
         modal.secret.Secret.from_name("my-mongodb-secret")
     ],
-    mounts=[modal.mount.Mount.from_local_dir(str(WEBPAGE_DIR), remote_path="/root/webpages/")]
+    mounts=[
+        modal.mount.Mount.from_local_dir(str(WEBPAGE_DIR), remote_path="/root/webpages/"),
+        modal.mount.Mount.from_local_file(str(Path(__file__).parent / "crawler.py"), remote_path="/root/crawler.py"),
+    ]
 )
 
 mongodb_url = os.environ["MONGODB_URI"]
@@ -115,12 +119,13 @@ def scrape_page():
                         'doc_type': 'bills'
                     }
                 else:
+                    # columns follow the listing headers: Title, Document Date, Chamber, Parliament, Session
                     obj = {
                         'title': td[0].text,
                         'url': url,
                         'metadata': {
-                            'chamber': str(td[1].text),
-                            'document_date': str(td[2].text),
+                            'document_date': str(td[1].text),
+                            'chamber': str(td[2].text),
                             'parliament': str(td[3].text),
                             'session': str(td[4].text),
                             'download_url': url,
@@ -141,7 +146,15 @@ def save_to_mongodb(documents):
     requesting = []
 
     for document in documents:
-        requesting.append(InsertOne(document))
+        # match on the listing's doc_id so a re-scrape refreshes a document instead of duplicating it,
+        # and set metadata field by field so the s3_path added by download_pdfs survives
+        fields = {key: value for key, value in document.items() if key != 'metadata'}
+        fields.update({f'metadata.{key}': value for key, value in document['metadata'].items()})
+        requesting.append(UpdateOne(
+            {'doc_type': document['doc_type'], 'metadata.doc_id': document['metadata']['doc_id']},
+            {'$set': fields},
+            upsert=True,
+        ))
 
         if len(requesting) >= CHUNK_SIZE:
             collection.bulk_write(requesting)
@@ -169,6 +182,48 @@ def main():
     save_to_mongodb(documents)
 
 
+@stub.function(
+    image=image,
+    timeout=1000,
+)
+def crawl_site(full: bool = False):
+    """Crawls the live listings and upserts the documents not yet in the corpus.
+
+    Stops paging a listing once it reaches documents already stored, unless `full`.
+    The ETag/Last-Modified of every page are kept in the `crawl_state` collection.
+    """
+    from crawler import LISTINGS, crawl
+
+    print("Crawling nass.gov.ng...")
+    known_ids = {doc_type: set(collection.distinct('metadata.doc_id', {'doc_type': doc_type})) for doc_type in LISTINGS}
+    crawl_state = db.get_collection("crawl_state")
+    state = crawl_state.find_one({'_id': 'validators'}) or {}
+    validators = state.get('pages', {})
+
+    documents, stats = crawl(known_ids, validators, full=full)
+    new_documents = [document for docs in documents.values() for document in docs]
+    print(f"Found {len(new_documents)} new documents: {stats}")
+    if new_documents:
+        save_to_mongodb(new_documents)
+    crawl_state.replace_one({'_id': 'validators'}, {'_id': 'validators', 'pages': validators}, upsert=True)
+
+
+@stub.function(
+    image=image,
+    timeout=1000,
+)
+def unswap_document_dates():
+    """One-off fix for hansard, order papers and votes stored by scrape_page with chamber and date swapped.
+
+    A chamber never contains a digit and a date always does, so rerunning this is a no-op.
+    """
+    result = collection.update_many(
+        {'doc_type': {'$ne': 'bills'}, 'metadata.chamber': {'$regex': '[0-9]'}},
+        [{'$set': {'metadata.chamber': '$metadata.document_date', 'metadata.document_date': '$metadata.chamber'}}],
+    )
+    print(f"Swapped chamber and document_date back on {result.modified_count} documents")
+
+
 def download_pdf(document):
     print(f"Downloading PDF {document['metadata']['doc_id']}...")
     url = document['metadata']['download_url']
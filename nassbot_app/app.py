@@ -2,7 +2,6 @@ import os
 from pathlib import Path
 import pymongo
 from dotenv import load_dotenv
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from pdfminer.pdfparser import PDFSyntaxError, PSEOF
 from botocore.exceptions import ConnectionClosedError
 import IPython
@@ -89,14 +88,24 @@ def get_doc_from_mongo():
     gpu=modal.gpu.T4(count=4),
     cpu=8.0,  # use more cpu for vector storage creation
 )
-def sync_vector_db_to_doc_db():
-    """Syncs the vector index onto the document storage."""
+def sync_vector_db_to_doc_db(n_shards: int = 1, to_pinecone: bool = False, compression: str = ""):
+    """Syncs the vector index onto the document storage.
+
+    With `n_shards` above one the index is split by document into that many
+    shards, built in parallel and searched scatter-gather. With `to_pinecone`
+    the same embeddings are also bulk-loaded into the Pinecone index. A
+    `compression` spec such as "pca:128" or "binary" keeps compressed vectors
+    in memory and rescores from the full ones on disk (unsharded only).
+    """
     from utils import vecstore
     from utils import utils
+    from utils.bill_index import BillIndex
+    from utils.chunking import document_id
+    from utils.index_versions import VersionedIndex
     from multiprocessing import Pool
 
     num_workers = 100
-    vector_store = vecstore.FaissVectorStore()
+    vector_store = vecstore.FaissVectorStore(compression=compression or vecstore.VECTOR_COMPRESSION)
     utils.pretty_log("connected to vector store")
 
     try:
@@ -108,13 +117,13 @@ def sync_vector_db_to_doc_db():
 
     utils.pretty_log("splitting into bite-size chunks")
     try:
-        results = utils.read_joblib_from_s3("nass-bot", "pdf_files/splitted_corpus.data")
+        results = utils.read_joblib_from_s3("nass-bot", "pdf_files/splitted_corpus_v2.data")
     except:
         pool = Pool(num_workers)
 
         results = pool.map(prep_documents_for_vector_storage, docs)
         pool.close()
-        utils.save_joblib_to_s3(results, "nass-bot", "pdf_files/splitted_corpus.data")
+        utils.save_joblib_to_s3(results, "nass-bot", "pdf_files/splitted_corpus_v2.data")
 
     texts, ids, metadatas = zip(*results)
 
@@ -125,9 +134,175 @@ def sync_vector_db_to_doc_db():
     utils.pretty_log("Getting text embeddings...")
     embeddings = vector_store.multi_encode_texts(texts)
 
-    utils.pretty_log(f"sending {len(embeddings)} total instances to vector store {vecstore.INDEX_NAME}")
+    # build the new version off to the side; serving containers keep using the live one
+    versioned_index = VersionedIndex(VECTOR_DIR, vecstore.INDEX_NAME)
+    version, staging_dir = versioned_index.stage()
+    vector_store.vector_dir = staging_dir
+
+    utils.pretty_log(f"sending {len(embeddings)} total instances to vector store {vecstore.INDEX_NAME} version {version}")
+    if n_shards > 1:
+        vector_store.add_sharded_embedding(texts, embeddings, ids, metadatas, n_shards)
+    else:
+        vector_store.add_embedding(texts, embeddings, ids, metadatas)
     utils.pretty_log(f"vector store created")
 
+    if to_pinecone:
+        pine_store = vecstore.PineVectorStore(batch_size=100, embedder=vector_store.lang_embedding_engine)
+        # kept outside the versioned directories so a failed load resumes on the next sync; removed once a load completes
+        checkpoint = VECTOR_DIR / f"{vecstore.INDEX_NAME}.pinecone-checkpoint"
+        pine_store.add_embedding(texts, embeddings, ids, metadatas, checkpoint=checkpoint)
+        utils.pretty_log(f"pinecone index {vecstore.INDEX_NAME} loaded")
+
+    # the first chunk holds the bill header, which is where sponsors are named
+    first_chunks = {document_id(doc): result[0][0] for doc, result in zip(docs, results) if result[0]}
+    bill_index = BillIndex.from_documents(docs, first_chunks)
+    bill_index.save(vector_store.bill_index_path())
+    utils.pretty_log(f"bill index with {len(bill_index.bills)} bills saved")
+
+    versioned_index.publish(
+        version, staging_dir, documents=len(docs), chunks=len(texts), bills=len(bill_index.bills), n_shards=n_shards,
+        compression=vector_store.compression if n_shards == 1 else None,
+    )
+    utils.pretty_log(f"vector store version {version} published")
+    removed = versioned_index.collect_garbage()
+    utils.pretty_log(f"removed unused index versions: {removed}") if removed else None
+
+
+@stub.function(
+    image=image,
+    timeout=500,
+    shared_volumes={
+        str(VECTOR_DIR): vector_storage,
+    },
+    gpu=modal.gpu.T4(count=4),
+    cpu=8.0,
+)
+def rebuild_vector_shard(shard: int):
+    """Re-embeds the documents of one shard and publishes a version with only that shard replaced."""
+    from utils import vecstore
+    from utils import utils
+    from utils.chunking import document_id
+    from utils.index_versions import VersionedIndex
+    from utils.sharding import rebuild_shard, shard_of
+    from multiprocessing import Pool
+
+    num_workers = 100
+    versioned_index = VersionedIndex(VECTOR_DIR, vecstore.INDEX_NAME)
+    base_version = versioned_index.current_version()
+    base_manifest = versioned_index.read_manifest(base_version) if base_version else {}
+    n_shards = base_manifest.get("n_shards", 1)
+    if n_shards < 2:
+        raise ValueError("the live index is not sharded; run sync_vector_db_to_doc_db with n_shards instead")
+
+    docs = [doc for doc in get_doc_from_mongo() if shard_of(document_id(doc), n_shards) == shard]
+    utils.pretty_log(f"re-embedding {len(docs)} documents of shard {shard}/{n_shards}")
+    with Pool(num_workers) as pool:
+        results = pool.map(prep_documents_for_vector_storage, docs)
+    texts = [text for doc_texts, _, _ in results for text in doc_texts]
+    ids = [doc_id for _, doc_ids, _ in results for doc_id in doc_ids]
+    metadatas = [metadata for _, _, doc_metadatas in results for metadata in doc_metadatas]
+
+    # every other shard, and the bill index, carry over from the live version
+    version, staging_dir = versioned_index.stage(base_version=base_version)
+    vector_store = vecstore.FaissVectorStore(vector_dir=staging_dir)
+    embeddings = vector_store.multi_encode_texts(texts)
+    chunks = rebuild_shard(staging_dir, vecstore.INDEX_NAME, shard, texts, embeddings, ids, metadatas)
+
+    versioned_index.publish(
+        version,
+        staging_dir,
+        documents=base_manifest.get("documents"),
+        bills=base_manifest.get("bills"),
+        n_shards=n_shards,
+        base_version=base_version,
+        rebuilt_shard=shard,
+    )
+    utils.pretty_log(f"shard {shard} rebuilt with {chunks} chunks and published as version {version}")
+
+
+@stub.function(
+    image=image,
+    shared_volumes={
+        str(VECTOR_DIR): vector_storage,
+    },
+)
+def verify_vector_index(version: str = ""):
+    """Hashes every file of an index version (the live one by default) against its manifest."""
+    from utils import utils
+    from utils.index_versions import VersionedIndex
+
+    versioned_index = VersionedIndex(VECTOR_DIR, os.environ["INDEX_NAME"])
+    version = version or versioned_index.current_version()
+    if not versioned_index.verify(version):
+        raise RuntimeError(f"index version {version} does not match its manifest")
+    utils.pretty_log(f"index version {version} matches its manifest")
+
+
+@stub.function(
+    image=image,
+    shared_volumes={
+        str(VECTOR_DIR): vector_storage,
+    },
+    schedule=modal.Period(hours=1),
+)
+def collect_vector_index_garbage():
+    """Removes index versions that are neither live nor being read by any container."""
+    from utils import utils
+    from utils.index_versions import VersionedIndex
+
+    removed = VersionedIndex(VECTOR_DIR, os.environ["INDEX_NAME"]).collect_garbage()
+    utils.pretty_log(f"removed unused index versions: {removed}")
+
+
+@stub.function(
+    image=image,
+    timeout=3600,
+    shared_volumes={
+        str(VECTOR_DIR): vector_storage,
+    },
+    gpu=modal.gpu.T4(count=4),
+    cpu=8.0,
+)
+def run_pipeline(n_shards: int = 1, compression: str = "", targets: str = ""):
+    """Runs the document pipeline, redoing only the stages and documents whose inputs changed.
+
+    Artifacts are kept on the vector volume, so a failed run picks up where
+    it stopped. `targets` is a comma-separated list of stages to run up to,
+    e.g. "split" to refresh chunks without embedding them.
+    """
+    from utils import vecstore
+    from utils import utils
+    from utils.document_pipeline import build_pipeline
+    from utils.pipeline import ArtifactStore
+
+    def fetch_pdf(document):
+        metadata = document["metadata"]
+        return utils.get_pdf_bytes(document["doc_type"], metadata["doc_id"], metadata.get("download_url"))
+
+    def extract_text(document, pdf_bytes):
+        if pdf_bytes is None:
+            return document["title"]
+        try:
+            return utils.pdf_text(pdf_bytes)
+        except (PDFSyntaxError, PSEOF):
+            utils.pretty_log(f"PDFSyntaxError|PSEOF on {document['doc_type']}-{document['metadata']['doc_id']}")
+            return document["title"]
+
+    vector_store = vecstore.FaissVectorStore(compression=compression or vecstore.VECTOR_COMPRESSION)
+    pipeline = build_pipeline(
+        ArtifactStore(VECTOR_DIR / "artifacts"),
+        lambda: list(get_doc_from_mongo()),
+        fetch_pdf,
+        extract_text,
+        vector_store,
+        n_shards=n_shards,
+    )
+    # one encoding pool for every embed batch of the run, started only if something is embedded
+    with vector_store.encoding_pool():
+        report = pipeline.run(targets.split(",") if targets else None)
+    utils.pretty_log(f"pipeline finished: {report}")
+    return report
+
 
 def prep_documents_for_vector_storage(document):
     """Prepare documents from document store for embedding and vector storage.
@@ -138,19 +313,15 @@ def prep_documents_for_vector_storage(document):
         document: A list of LangChain.Documents with text, metadata, and a hash ID.
     """
     from utils import utils
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        chunk_size=500, chunk_overlap=100, allowed_special="all"
-    )
+    from utils.chunking import get_text_splitter, split_document
+    text_splitter = get_text_splitter()
     try:
         text = utils.get_pdf_text(document["doc_type"], document["metadata"]["doc_id"])
     except (PDFSyntaxError, PSEOF, ConnectionClosedError):
         utils.pretty_log(f"PDFSyntaxError|PSEOF on {document['doc_type']}-{document['metadata']['doc_id']}")
         text = document["title"]
 
-    doc_texts = text_splitter.split_text(text)
-    ids = [str(document["_id"]) for _ in range(len(doc_texts))]
-    metadata = [document["metadata"] for _ in range(len(doc_texts))]
-    return doc_texts, ids, metadata
+    return split_document(document, text, text_splitter)
 
 
 @stub.function(
@@ -169,19 +340,66 @@ def debug():
         str(VECTOR_DIR): vector_storage,
     },
 )
-@stub.web_endpoint(method="GET", label="nass-bot-hook")
-def web(query: str, request_id=None):
+@modal.asgi_app(label="nass-bot-hook")
+def web():
+    """Exposes our Q&A chain for queries via a web endpoint.
+
+    `/metrics` is served by the same app, so a scrape sees the spans and
+    counters of the container that answered the queries. Each container
+    warms up on the most frequently logged questions in the background.
+    `profile=true`, or $PROFILE_REQUESTS for requests over the threshold,
+    writes a sampled profile to the vector volume (see `utils.profiler`).
+    """
+    import threading
+    from fastapi import FastAPI
+    from fastapi.responses import PlainTextResponse
+    from utils import metrics
     from utils import utils
+    from utils.profiler import profile_request
+    from utils.query_log import get_query_log
+    from chains import qa_chain
+
+    web_app = FastAPI()
+    threading.Thread(target=qa_chain.warm_up, name="warm-up", daemon=True).start()
+
+    @web_app.get("/")
+    def answer_query(query: str, request_id=None, profile: bool = False):
+        utils.pretty_log(
+            f"handling request with client-provided id: {request_id}"
+        ) if request_id else None
+        with profile_request(request_id, force=profile) as request_profile:
+            with metrics.trace(request_id), metrics.span("web"):
+                answer = qa_chain.qanda_langchain(query, request_id=request_id, with_logging=True)
+        query_log = get_query_log()
+        if query_log is not None:
+            query_log.record(query)
+        response = {
+            "answer": answer,
+        }
+        if request_profile.path is not None:
+            response["profile"] = str(request_profile.path)
+        return response
+
+    @web_app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus_metrics():
+        """Exposes per-stage latency histograms and cache/LLM counters for scraping."""
+        return metrics.render()
+
+    return web_app
+
+
+@stub.function(
+    image=image,
+    timeout=600,
+    shared_volumes={
+        str(VECTOR_DIR): vector_storage,
+    },
+)
+def warm_up(n_questions: int = 20, budget_s: float = 300.0):
+    """Fills the shared prompt cache with answers to the most frequently logged questions, e.g. after a deploy."""
     from chains import qa_chain
 
-    """Exposes our Q&A chain for queries via a web endpoint."""
-    utils.pretty_log(
-        f"handling request with client-provided id: {request_id}"
-    ) if request_id else None
-    answer = qa_chain.qanda_langchain(query, request_id=request_id, with_logging=True)
-    return {
-        "answer": answer,
-    }
+    return qa_chain.warm_up(n_questions, budget_s)
 
 
 @stub.function(
@@ -190,9 +408,13 @@ def web(query: str, request_id=None):
         str(VECTOR_DIR): vector_storage,
     },
 )
-def cli(query: str):
+def cli(query: str, profile: bool = False):
     from utils import utils
+    from utils.profiler import profile_request
     from chains import qa_chain
 
-    answer = qa_chain.qanda_langchain(query, with_logging=False)
+    with profile_request("cli", force=profile) as request_profile:
+        answer = qa_chain.qanda_langchain(query, with_logging=False)
     utils.pretty_log(f"🦜 ANSWER 🦜 \n {answer}")
+    if request_profile.path is not None:
+        utils.pretty_log(f"profile written to {request_profile.path}")
@@ -0,0 +1,102 @@
+"""Chunk storage benchmark: LangChain's pickled docstore against the compact chunk store.
+
+Builds the same index in both layouts, then loads each in a fresh process
+and reports file size, load time, resident memory added by the load and
+query latency including rehydrating the hits:
+
+    cd nassbot_app && python -m benchmarks.chunk_store --docs 1000
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from multiprocessing import get_context
+
+from benchmarks import common
+from benchmarks.corpus import load_corpus, make_corpus
+from benchmarks.retrieval import content_recall, split_corpus
+from utils.chunking import get_text_splitter
+from utils.embedders import get_embedder
+from utils.vecstore import FaissVectorStore
+
+LAYOUTS = {"langchain": False, "compact": True}
+
+
+def _rss_bytes():
+    # Linux only, like the containers the index is served from
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def _measure_load(vector_dir, questions, k):
+    """Runs in a fresh process, so the resident memory it reports belongs to this load alone."""
+    embedder = get_embedder("hash")
+    vector_store = FaissVectorStore(embedder=embedder, vector_dir=vector_dir, index_name="benchmark")
+    query_embeddings = [embedder.embed_query(question["question"]) for question in questions]
+    gc.collect()
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    vector_index = vector_store.connect_to_vector_index()
+    load_s = time.perf_counter() - start
+    gc.collect()
+    rss_added = _rss_bytes() - rss_before
+
+    latencies, results = [], []
+    for query_embedding in query_embeddings:
+        with common.Timer() as t:
+            results.append(vector_index.similarity_search_by_vector(query_embedding, k=k))
+        latencies.append(t.seconds)
+    return {
+        "load_s": round(load_s, 4),
+        "rss_added_bytes": rss_added,
+        **common.latency_summary(latencies, "query_search_"),
+        "content_recall_at_k": round(content_recall(questions, results, k), 4),
+    }
+
+
+def run(documents, questions, k=4):
+    texts, ids, metadatas = split_corpus(documents, get_text_splitter("chars"))
+    embedder = get_embedder("hash")
+    embeddings = embedder.encode(texts)
+    metrics = {"documents": len(documents), "chunks": len(texts)}
+
+    for layout, compact in LAYOUTS.items():
+        with tempfile.TemporaryDirectory() as vector_dir:
+            vector_store = FaissVectorStore(
+                embedder=embedder, vector_dir=vector_dir, index_name="benchmark", compact=compact
+            )
+            with common.Timer() as t:
+                vector_store.add_embedding(texts, embeddings, ids, metadatas)
+            metrics[f"{layout}_build_s"] = round(t.seconds, 4)
+            metrics[f"{layout}_index_size_bytes"] = vector_store.index_size_bytes()
+            with get_context("spawn").Pool(1) as pool:
+                load_metrics = pool.apply(_measure_load, (vector_dir, questions, k))
+        metrics.update({f"{layout}_{key}": value for key, value in load_metrics.items()})
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1000, help="Number of synthetic documents.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus.")
+    parser.add_argument("--corpus", help="Fixture corpus JSON to use instead of a synthetic one.")
+    parser.add_argument("--k", type=int, default=4, help="Number of chunks retrieved per query.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    if args.corpus:
+        documents, questions = load_corpus(args.corpus)
+    else:
+        documents, questions = make_corpus(args.docs, seed=args.seed)
+
+    metrics = run(documents, questions, args.k)
+
+    return common.finish("chunk_store", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
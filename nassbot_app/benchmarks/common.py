@@ -0,0 +1,132 @@
+"""Helpers shared by the benchmark scripts: timing, percentiles and result files."""
+import json
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# metric name suffixes and whether bigger numbers are better
+HIGHER_IS_BETTER = ("_per_s", "recall_at_1", "recall_at_k", "hit_rate")
+LOWER_IS_BETTER = ("_ms", "_s", "_bytes", "_mb", "error_rate")
+
+
+class Timer:
+    """Context manager that records elapsed wall-clock seconds in `.seconds`."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self.start
+
+
+def percentile(values, q):
+    """Linearly interpolated percentile, with q in [0, 100]."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(seconds, prefix=""):
+    """Summarises a list of durations in seconds as millisecond percentiles."""
+    return {
+        f"{prefix}p50_ms": round(percentile(seconds, 50) * 1000, 3),
+        f"{prefix}p90_ms": round(percentile(seconds, 90) * 1000, 3),
+        f"{prefix}p99_ms": round(percentile(seconds, 99) * 1000, 3),
+        f"{prefix}mean_ms": round(sum(seconds) / len(seconds) * 1000, 3) if seconds else float("nan"),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name, config, metrics, output=None):
+    """Writes a benchmark run to JSON and returns the path it was written to."""
+    now = datetime.now(timezone.utc)
+    if output is None:
+        RESULTS_DIR.mkdir(parents=True, exist_ok=True)
+        output = RESULTS_DIR / f"{name}-{now.strftime('%Y%m%dT%H%M%SZ')}.json"
+    output = Path(output)
+    run = {
+        "benchmark": name,
+        "timestamp": now.isoformat(),
+        "git_revision": git_revision(),
+        "config": config,
+        "metrics": metrics,
+    }
+    output.write_text(json.dumps(run, indent=2))
+    return output
+
+
+def _direction(metric):
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(metrics, baseline_path, tolerance=0.1):
+    """Compares metrics with a previous run and returns the ones that regressed.
+
+    A metric regresses when it moves in its bad direction by more than
+    `tolerance` relative to the baseline. Metrics without a known direction,
+    or missing from either run, are ignored.
+    """
+    baseline = json.loads(Path(baseline_path).read_text())["metrics"]
+    regressions = []
+    for metric, value in metrics.items():
+        direction = _direction(metric)
+        before = baseline.get(metric)
+        if not direction or not isinstance(before, (int, float)) or not isinstance(value, (int, float)):
+            continue
+        change = (value - before) / abs(before) if before else 0.0
+        if change * direction < -tolerance:
+            regressions.append({"metric": metric, "baseline": before, "current": value, "change": round(change, 4)})
+    return regressions
+
+
+def add_result_args(parser):
+    """Adds the --output, --baseline and --tolerance flags `finish` reads."""
+    parser.add_argument("--output", help="Where to write the results JSON.")
+    parser.add_argument("--baseline", help="Previous results JSON to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression.")
+    return parser
+
+
+def finish(name, args, metrics, title=None):
+    """Writes the results with the run's flags as config, checks the baseline and reports.
+
+    Returns the exit status: 1 if any metric regressed, else 0.
+    """
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    path = write_results(name, config, metrics, args.output)
+    regressions = compare(metrics, args.baseline, args.tolerance) if args.baseline else []
+    report(title or name, metrics, path, regressions)
+    return 1 if regressions else 0
+
+
+def report(name, metrics, path, regressions=None):
+    print(f"== {name} ==")
+    width = max(len(metric) for metric in metrics)
+    for metric, value in metrics.items():
+        print(f"{metric:<{width}}  {value}")
+    print(f"results written to {path}")
+    for regression in regressions or []:
+        print(
+            f"REGRESSION {regression['metric']}: {regression['baseline']} -> {regression['current']}"
+            f" ({regression['change']:+.1%})"
+        )
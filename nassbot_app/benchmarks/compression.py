@@ -0,0 +1,109 @@
+"""Vector compression benchmark: the flat float32 index against compressed codes with exact rescoring.
+
+Builds the compact index once per compression spec, then reports the memory
+the in-memory vectors take, query latency, how many of the flat index's
+top-k chunks each variant returns (`neighbour_recall_at_k`) and whether the
+answer-bearing chunk is still retrieved (`content_recall_at_k`):
+
+    cd nassbot_app && python -m benchmarks.compression --docs 1000 --specs pca:128 pca:64 trunc:192 binary
+
+Each spec is also measured with rescoring off, as `{spec}_norescore_*`.
+The hash embedder spreads its signal over every dimension, so PCA and
+truncation lose more on it than on MiniLM; pass `--embedder all-MiniLM-L6-v2`
+where the model is available.
+"""
+import argparse
+import sys
+import tempfile
+
+from benchmarks import common
+from benchmarks.corpus import load_corpus, make_corpus
+from benchmarks.retrieval import content_recall, split_corpus
+from utils.chunking import get_text_splitter
+from utils.embedders import get_embedder
+from utils.vecstore import FaissVectorStore
+
+DEFAULT_SPECS = ("pca:128", "pca:64", "trunc:192", "binary")
+
+
+def _codes_bytes(index):
+    import faiss
+
+    serialize = faiss.serialize_index_binary if isinstance(index, faiss.IndexBinary) else faiss.serialize_index
+    return len(serialize(index))
+
+
+def _search(vector_index, query_embeddings, k):
+    latencies, results = [], []
+    for query_embedding in query_embeddings:
+        with common.Timer() as t:
+            results.append(vector_index.similarity_search_by_vector(query_embedding, k=k))
+        latencies.append(t.seconds)
+    return latencies, results
+
+
+def _neighbour_recall(exact, approximate, k):
+    found = [
+        len({doc.page_content for doc in hits} & {doc.page_content for doc in truth}) / max(1, len(truth))
+        for truth, hits in zip(exact, approximate)
+    ]
+    return sum(found) / max(1, len(found))
+
+
+def run(documents, questions, embedder_name="hash", specs=DEFAULT_SPECS, k=4):
+    texts, ids, metadatas = split_corpus(documents, get_text_splitter("chars"))
+    embedder = get_embedder(embedder_name)
+    embeddings = embedder.encode(texts)
+    query_embeddings = [embedder.embed_query(question["question"]) for question in questions]
+    metrics = {"documents": len(documents), "chunks": len(texts), "dimension": int(embeddings.shape[1])}
+
+    exact = None
+    for spec in ("flat", *specs):
+        with tempfile.TemporaryDirectory() as vector_dir:
+            vector_store = FaissVectorStore(
+                embedder=embedder, vector_dir=vector_dir, index_name="benchmark",
+                compression=None if spec == "flat" else spec,
+            )
+            with common.Timer() as t:
+                vector_store.add_embedding(texts, embeddings, ids, metadatas)
+            metrics[f"{spec}_build_s"] = round(t.seconds, 4)
+            vector_index = vector_store.connect_to_vector_index()
+            metrics[f"{spec}_memory_bytes"] = _codes_bytes(vector_index.index)
+
+            variants = {spec: None} if spec == "flat" else {spec: vector_index.rescore, f"{spec}_norescore": 0}
+            for name, rescore in variants.items():
+                if rescore is not None:
+                    vector_index.rescore = rescore
+                latencies, results = _search(vector_index, query_embeddings, k)
+                exact = exact or results
+                metrics.update(common.latency_summary(latencies, f"{name}_query_"))
+                metrics[f"{name}_neighbour_recall_at_k"] = round(_neighbour_recall(exact, results, k), 4)
+                metrics[f"{name}_content_recall_at_k"] = round(content_recall(questions, results, k), 4)
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1000, help="Number of synthetic documents.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus.")
+    parser.add_argument("--corpus", help="Fixture corpus JSON to use instead of a synthetic one.")
+    parser.add_argument("--embedder", default="hash", help='"hash" or a SentenceTransformer model name.')
+    parser.add_argument("--specs", nargs="+", default=list(DEFAULT_SPECS), help="`utils.compression` specs to compare.")
+    parser.add_argument("--k", type=int, default=4, help="Number of chunks retrieved per query.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    if args.corpus:
+        documents, questions = load_corpus(args.corpus)
+    else:
+        documents, questions = make_corpus(args.docs, seed=args.seed)
+
+    metrics = run(documents, questions, args.embedder, args.specs, args.k)
+
+    return common.finish("compression", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
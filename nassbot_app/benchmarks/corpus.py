@@ -0,0 +1,162 @@
+"""Synthetic NASS-like corpus with labelled questions for offline benchmarks.
+
+Documents have the same shape as the records `scrape_page` stores in Mongo,
+plus a "text" field standing in for the extracted PDF text, so they can be
+fed through the same splitting and indexing code as the real corpus.
+"""
+import json
+import random
+
+SUBJECTS = [
+    "cassava flour", "warehouse receipts", "climate change", "donkey slaughter", "patents and designs",
+    "sustainable energy", "petroleum host communities", "financial reporting", "counterfeit goods",
+    "industrial parks", "produce inspection", "maritime security", "cybercrime", "electoral offences",
+    "water resources", "animal health", "mining cadastre", "digital identity", "tourism development",
+    "solid minerals", "public procurement", "copyright", "road safety", "gas flaring", "pension reform",
+    "fisheries", "forestry", "nuclear safety", "consumer protection", "data protection", "cocoa export",
+    "rice production", "river basins", "ports and harbours", "insurance", "child rights", "disability",
+    "traditional medicine", "sports development", "broadcasting", "railway", "aviation safety",
+]
+INSTITUTIONS = [
+    "Federal College of Agriculture", "Federal Medical Centre", "Federal University of Technology",
+    "National Agency", "Regulatory Commission", "Development Institute", "Research Council",
+    "Federal Polytechnic", "Training Academy", "Inspection Service",
+]
+STATES = [
+    "Abia", "Adamawa", "Akwa Ibom", "Anambra", "Bauchi", "Bayelsa", "Benue", "Borno", "Cross River",
+    "Delta", "Ebonyi", "Edo", "Ekiti", "Enugu", "Gombe", "Imo", "Jigawa", "Kaduna", "Kano", "Katsina",
+    "Kebbi", "Kogi", "Kwara", "Lagos", "Nasarawa", "Niger", "Ogun", "Ondo", "Osun", "Oyo", "Plateau",
+    "Rivers", "Sokoto", "Taraba", "Yobe", "Zamfara",
+]
+FIRST_NAMES = ["Ibrahim", "Adamu", "Oluremi", "Uche", "Danjuma", "Stella", "Kabiru", "Biodun", "Rose", "Yahaya"]
+LAST_NAMES = ["Gobir", "Aliero", "Tinubu", "Ekweremadu", "Goje", "Oduah", "Gaya", "Olujimi", "Oko", "Abdullahi"]
+COMMITTEES = ["Agriculture", "Health", "Judiciary", "Finance", "Trade and Investment", "Environment", "Education"]
+BOILERPLATE = [
+    "BE IT ENACTED by the National Assembly of the Federal Republic of Nigeria as follows.",
+    "The Minister may make regulations for the purpose of giving full effect to the provisions of this Act.",
+    "Any person who contravenes the provisions of this section commits an offence and is liable on conviction.",
+    "The Governing Board shall consist of a Chairman and such other members as may be appointed.",
+    "The funds of the Agency shall consist of such sums as may be appropriated by the National Assembly.",
+    "Nothing in this Act shall affect the powers conferred on any other body by an Act of the National Assembly.",
+    "The Senate resumed plenary at 10:32 am with the Senate President presiding.",
+    "Votes and proceedings of the previous sitting were read and approved.",
+]
+WEEKDAYS = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY"]
+MONTHS = ["JANUARY", "FEBRUARY", "MARCH", "APRIL", "MAY", "JUNE", "JULY", "SEPTEMBER", "OCTOBER", "NOVEMBER"]
+
+
+def _date(rng):
+    return f"20{rng.randint(10, 22):02d}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def _body(rng, specific, paragraphs, answer):
+    sentences = []
+    for _ in range(paragraphs):
+        sentences.extend(rng.sample(BOILERPLATE, 3))
+        sentences.append(rng.choice(specific))
+    # the one sentence that answers the document's questions, so retrieval can be checked against chunk text
+    sentences.insert(rng.randrange(len(sentences) + 1), answer)
+    return "\n\n".join(" ".join(sentences[i:i + 4]) for i in range(0, len(sentences), 4))
+
+
+def _bill(rng, doc_id, subject, institution, state):
+    sponsor = f"Sen. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    year = rng.randint(2016, 2022)
+    title = f"{institution} {state} {subject} (Establishment) Bill, {year} (SB. {rng.randint(100, 1200)})".upper()
+    readings = [_date(rng) if rng.random() < p else "" for p in (0.8, 0.5, 0.2)]
+    specific = [
+        f"There is hereby established the {institution} {state} for {subject}.",
+        f"The {institution} shall promote research, regulation and development of {subject} in {state} State.",
+        f"The objectives of the {institution} include training on {subject} across {state} State.",
+    ]
+    answer = f"The {institution} {state} shall be the lead agency for {subject} policy."
+    text = f"{title}\n\nSponsored by {sponsor}\n\n" + _body(rng, specific, rng.randint(4, 40), answer)
+    document = {
+        "_id": f"bills-{doc_id}",
+        "title": title,
+        "url": f"https://nass.gov.ng/documents/bill/{doc_id}",
+        "metadata": {
+            "chamber": "Senate",
+            "first_reading": readings[0],
+            "second_reading": readings[1],
+            "commitee_referred": rng.choice(COMMITTEES) if readings[1] else "",
+            "third_reading": readings[2],
+            "download_url": f"https://nass.gov.ng/documents/billdownload/{doc_id}.pdf",
+            "doc_id": str(doc_id),
+        },
+        "doc_type": "bills",
+        "text": text,
+    }
+    questions = [
+        f"What is the {subject} bill for {state} about?",
+        f"Is there a bill to establish a {institution} for {subject} in {state}?",
+    ]
+    return document, questions, answer
+
+
+def _hansard(rng, doc_id, subject, state):
+    day, month, year = rng.randint(1, 28), rng.choice(MONTHS), rng.randint(2010, 2022)
+    title = f"SENATE HANSARD FOR {rng.choice(WEEKDAYS)} {day}TH {month}, {year}"
+    answer = f"The motion on {subject} in {state} was adopted after debate."
+    specific = [
+        f"The Senate debated the motion on {subject} raised by the senator representing {state}.",
+        f"Senators urged the Federal Government to intervene on {subject} in {state} State.",
+    ]
+    document = {
+        "_id": f"hansard-{doc_id}",
+        "title": title,
+        "url": f"https://nass.gov.ng/documents/download/{doc_id}",
+        "metadata": {
+            "chamber": "Senate",
+            "document_date": f"{year}-{MONTHS.index(month) + 1:02d}-{day:02d}",
+            "parliament": "9th Parliament",
+            "session": "1st Session",
+            "download_url": f"https://nass.gov.ng/documents/download/{doc_id}",
+            "doc_id": str(doc_id),
+        },
+        "doc_type": "hansard",
+        "text": f"{title}\n\n" + _body(rng, specific, rng.randint(10, 80), answer),
+    }
+    questions = [f"When did the Senate debate {subject} in {state}?"]
+    return document, questions, answer
+
+
+def make_corpus(n_docs=500, seed=0, hansard_ratio=0.3):
+    """Builds a deterministic corpus and labelled questions.
+
+    Returns:
+        A tuple (documents, questions) where each question is a dict with the
+        "question" text, the "doc_id" of the single document that answers it and
+        the "answer" sentence that a chunk answering it contains.
+    """
+    rng = random.Random(seed)
+    # each (subject, state) pair is used once so every question has exactly one answer
+    combos = [(subject, state) for subject in SUBJECTS for state in STATES]
+    rng.shuffle(combos)
+    if n_docs > len(combos):
+        raise ValueError(f"at most {len(combos)} synthetic documents are supported")
+
+    documents, questions = [], []
+    for n, (subject, state) in enumerate(combos[:n_docs]):
+        doc_id = 10000 + n
+        if rng.random() < hansard_ratio:
+            document, doc_questions, answer = _hansard(rng, doc_id, subject, state)
+        else:
+            document, doc_questions, answer = _bill(rng, doc_id, subject, rng.choice(INSTITUTIONS), state)
+        documents.append(document)
+        questions.extend(
+            {"question": q, "doc_id": str(doc_id), "answer": answer} for q in doc_questions
+        )
+    return documents, questions
+
+
+def load_corpus(path):
+    """Loads a fixture corpus saved as {"documents": [...], "questions": [...]}."""
+    with open(path) as f:
+        fixture = json.load(f)
+    return fixture["documents"], fixture["questions"]
+
+
+def save_corpus(path, documents, questions):
+    with open(path, "w") as f:
+        json.dump({"documents": documents, "questions": questions}, f)
@@ -0,0 +1,110 @@
+"""Local stand-in for the Modal `web` endpoint for load tests.
+
+Serves the real `qa_chain.qanda_langchain` over HTTP with the same query
+parameters as the deployed hook, backed by a FAISS index built from the
+synthetic corpus with the hash embedder and an LLM pointed at `fake_llm`:
+
+    cd nassbot_app && python -m benchmarks.fake_backend --port 8080 --llm-url http://127.0.0.1:8081/v1
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from benchmarks.corpus import make_corpus
+from utils import metrics
+
+INDEX_NAME = "loadtest"
+
+QUEUE_DEPTH = metrics.Gauge(
+    "nassbot_backend_queue_depth", "Requests accepted by the backend and waiting for a worker."
+)
+
+
+def build_fixture_index(vector_dir, n_docs=300, seed=0):
+    """Builds a FAISS index of the synthetic corpus with the hash embedder."""
+    from benchmarks.retrieval import split_corpus
+    from utils.chunking import get_text_splitter
+    from utils.embedders import HashEmbedder
+    from utils.vecstore import FaissVectorStore
+
+    documents, _ = make_corpus(n_docs, seed=seed)
+    texts, ids, metadatas = split_corpus(documents, get_text_splitter("chars"))
+    vector_store = FaissVectorStore(embedder=HashEmbedder(), vector_dir=vector_dir, index_name=INDEX_NAME)
+    vector_store.add_embedding(texts, vector_store.multi_encode_texts(texts), ids, metadatas)
+
+
+class Backend:
+    """Runs Q&A requests on a fixed pool of workers, like a capped number of containers."""
+
+    def __init__(self, workers=4):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _answer(self, query, request_id):
+        from chains import qa_chain
+
+        QUEUE_DEPTH.dec()
+        with metrics.trace(request_id), metrics.span("web"):
+            return qa_chain.qanda_langchain(query, request_id=request_id)
+
+    async def web(self, request):
+        query = request.query.get("query")
+        if not query:
+            return web.json_response({"error": "missing query"}, status=400)
+        QUEUE_DEPTH.inc()
+        loop = asyncio.get_running_loop()
+        try:
+            answer = await loop.run_in_executor(self.executor, self._answer, query, request.query.get("request_id"))
+        except Exception as e:
+            return web.json_response({"error": repr(e)}, status=500)
+        return web.json_response({"answer": answer})
+
+    async def prometheus_metrics(self, request):
+        return web.Response(text=metrics.render(), content_type="text/plain")
+
+
+def make_app(backend):
+    app = web.Application()
+    app.router.add_get("/", backend.web)
+    app.router.add_get("/metrics", backend.prometheus_metrics)
+    return app
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4, help="Requests answered concurrently.")
+    parser.add_argument("--docs", type=int, default=300, help="Synthetic documents in the fixture index.")
+    parser.add_argument("--llm-url", default="http://127.0.0.1:8081/v1", help="Base URL of the fake LLM.")
+    parser.add_argument(
+        "--llm-cache", action="store_true", help="Keep the prompt cache on; off by default so repeats reach the LLM."
+    )
+    return parser
+
+
+def main():
+    args = make_argparser().parse_args()
+    vector_dir = tempfile.mkdtemp(prefix="nassbot-loadtest-")
+
+    # the vector store and OpenAI client read these at import time
+    os.environ.update(
+        VECTOR_DIR=vector_dir,
+        INDEX_NAME=INDEX_NAME,
+        EMBEDDER="hash",
+        OPENAI_API_BASE=args.llm_url,
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-fake"),
+        LLM_CACHE_PATH=os.path.join(vector_dir, "llm-cache.sqlite") if args.llm_cache else "",
+    )
+    # the fake LLM has no quota; keep the gateway's limits out of the way unless set explicitly
+    os.environ.setdefault("LLM_REQUESTS_PER_MIN", "1000000")
+    os.environ.setdefault("LLM_TOKENS_PER_MIN", "1000000000")
+    build_fixture_index(vector_dir, args.docs)
+    web.run_app(make_app(Backend(args.workers)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
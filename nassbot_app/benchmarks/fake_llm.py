@@ -0,0 +1,124 @@
+"""Local stand-in for the OpenAI completions API with configurable latency.
+
+Speaks enough of `POST /v1/completions` for the `openai` client and the
+LangChain Q&A chain, including `"stream": true` server-sent events:
+
+    cd nassbot_app && python -m benchmarks.fake_llm --port 8081 --latency 0.8
+    export OPENAI_API_BASE=http://127.0.0.1:8081/v1 OPENAI_API_KEY=sk-fake
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+from aiohttp import web
+
+ANSWER = "The bill seeks to establish the institution described in the sources and provide for related matters."
+SOURCE_RE = re.compile(r"Source:\s*(\S+)")
+
+
+def _answer_for(prompt):
+    sources = SOURCE_RE.findall(prompt)[-2:]
+    return f" {ANSWER}\nSOURCES: {', '.join(sources) if sources else 'none'}"
+
+
+def _completion(model, text, prompt, finish_reason="stop"):
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = len(text) // 4
+    return {
+        "id": f"cmpl-{uuid.uuid4().hex}",
+        "object": "text_completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"text": text, "index": 0, "logprobs": None, "finish_reason": finish_reason}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+class FakeLLM:
+    """Completion handler whose latency and failure behaviour are set from the command line.
+
+    Arguments:
+        latency: Seconds before the first token (or the whole response when not streaming).
+        jitter: Extra uniformly random latency, in seconds.
+        token_delay: Seconds between streamed tokens, also added per token to non-streamed responses.
+        error_rate: Fraction of requests answered with a 429 rate-limit error.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.0, token_delay=0.0, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.token_delay = token_delay
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.in_flight = 0
+
+    async def completions(self, request):
+        body = await request.json()
+        prompt = body.get("prompt", "")
+        if isinstance(prompt, list):
+            prompt = prompt[0] if prompt else ""
+        model = body.get("model", "text-davinci-003")
+        self.requests += 1
+
+        if self.rng.random() < self.error_rate:
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": None}}, status=429
+            )
+
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.latency + self.rng.uniform(0, self.jitter))
+            text = _answer_for(prompt)
+            tokens = re.findall(r"\s*\S+", text)
+            if not body.get("stream"):
+                await asyncio.sleep(self.token_delay * len(tokens))
+                return web.json_response(_completion(model, text, prompt))
+
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for n, token in enumerate(tokens):
+                finish_reason = "stop" if n == len(tokens) - 1 else None
+                chunk = _completion(model, token, prompt, finish_reason)
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                await asyncio.sleep(self.token_delay)
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response
+        finally:
+            self.in_flight -= 1
+
+    async def stats(self, request):
+        return web.json_response({"requests": self.requests, "in_flight": self.in_flight})
+
+
+def make_app(fake_llm):
+    app = web.Application()
+    app.router.add_post("/v1/completions", fake_llm.completions)
+    app.router.add_get("/stats", fake_llm.stats)
+    return app
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds before the first token.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency in seconds.")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between tokens.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429.")
+    return parser
+
+
+if __name__ == "__main__":
+    args = make_argparser().parse_args()
+    fake_llm = FakeLLM(args.latency, args.jitter, args.token_delay, args.error_rate)
+    web.run_app(make_app(fake_llm), host=args.host, port=args.port)
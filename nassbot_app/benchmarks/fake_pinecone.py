@@ -0,0 +1,95 @@
+"""In-process stand-in for a `pinecone.Index`, with configurable latency and failures.
+
+Implements the subset of the index API that bulk loads and checks use:
+`upsert`, `fetch`, `query` and `describe_index_stats`.
+"""
+import random
+import threading
+import time
+
+import numpy as np
+
+
+class FakePineconeError(Exception):
+    """Raised where the real client would raise an `ApiException`, e.g. on a 429 or 5xx."""
+
+
+class FakePineconeIndex:
+    """Vectors kept in a dict per namespace.
+
+    Arguments:
+        dimension: Length every upserted vector must have, as on a real index.
+        latency: Seconds each request takes, released by the caller's thread like network I/O.
+        error_rate: Fraction of upserts that fail before writing anything.
+        fail_after: Fail every upsert after this many have succeeded, to simulate an outage.
+        max_batch: Largest upsert accepted, mirroring the service's request size limit.
+    """
+
+    def __init__(self, dimension=384, latency=0.0, error_rate=0.0, fail_after=None, max_batch=1000, seed=0):
+        self.dimension = dimension
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fail_after = fail_after
+        self.max_batch = max_batch
+        self.rng = random.Random(seed)
+        self.namespaces = {}
+        self.upserts = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors, namespace=None, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.rng.random() < self.error_rate or (
+                self.fail_after is not None and self.upserts >= self.fail_after
+            )
+        try:
+            time.sleep(self.latency)
+            if fail:
+                with self._lock:
+                    self.failures += 1
+                raise FakePineconeError("(429) Too Many Requests")
+            if len(vectors) > self.max_batch:
+                raise FakePineconeError(f"(400) batch of {len(vectors)} exceeds {self.max_batch} vectors")
+            records = {}
+            for vector_id, values, metadata in vectors:
+                if len(values) != self.dimension:
+                    raise FakePineconeError(f"(400) vector dimension {len(values)} does not match {self.dimension}")
+                records[vector_id] = {"id": vector_id, "values": list(values), "metadata": dict(metadata)}
+            with self._lock:
+                self.namespaces.setdefault(namespace or "", {}).update(records)
+                self.upserts += 1
+            return {"upserted_count": len(records)}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def fetch(self, ids, namespace=None):
+        stored = self.namespaces.get(namespace or "", {})
+        return {"vectors": {vector_id: stored[vector_id] for vector_id in ids if vector_id in stored}}
+
+    def query(self, vector, top_k=10, include_metadata=False, namespace=None, **kwargs):
+        stored = list(self.namespaces.get(namespace or "", {}).values())
+        if not stored:
+            return {"matches": []}
+        query = np.asarray(vector[0] if vector and isinstance(vector[0], (list, tuple)) else vector, dtype="float32")
+        matrix = np.asarray([record["values"] for record in stored], dtype="float32")
+        scores = matrix @ query
+        matches = []
+        for i in np.argsort(-scores)[:top_k]:
+            match = {"id": stored[i]["id"], "score": float(scores[i])}
+            if include_metadata:
+                match["metadata"] = dict(stored[i]["metadata"])
+            matches.append(match)
+        return {"matches": matches}
+
+    def describe_index_stats(self):
+        namespaces = {name: {"vector_count": len(records)} for name, records in self.namespaces.items()}
+        return {
+            "dimension": self.dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values()),
+        }
@@ -0,0 +1,143 @@
+"""LLM gateway benchmark: a burst of completions against the fake completion server.
+
+Starts `fake_llm` in-process with an injected 429 rate, then sends the same
+burst of prompts (some repeated, as when the same question meets the same
+sources) straight through `requests` and through `LLMGateway`, and reports
+successes, retries, cache hits and the request rate the gateway held to:
+
+    cd nassbot_app && python -m benchmarks.llm_gateway --requests 200 --error-rate 0.2 --rpm 1200
+"""
+import argparse
+import asyncio
+import random
+import socket
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from benchmarks import common
+from benchmarks.fake_llm import FakeLLM, make_app
+from utils import metrics as nassbot_metrics
+from utils.llm_gateway import LLMError, LLMGateway
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_background(fake_llm):
+    """Runs the fake completion server on a daemon thread and returns its base URL."""
+    port = _free_port()
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(make_app(fake_llm))
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, name="fake-llm", daemon=True).start()
+    ready.wait(10)
+    return f"http://127.0.0.1:{port}/v1"
+
+
+def make_prompts(n, distinct, seed=0):
+    rng = random.Random(seed)
+    return [
+        f"Content: Bill {bill} establishes a college.\nSource: https://nass.gov.ng/documents/bill/{bill}\n"
+        f"QUESTION: What does bill {bill} do?\nFINAL ANSWER:"
+        for bill in (rng.randrange(distinct) for _ in range(n))
+    ]
+
+
+def _burst(call, prompts, concurrency):
+    latencies, failures = [], 0
+    lock = threading.Lock()
+
+    def one(prompt):
+        nonlocal failures
+        with common.Timer() as t:
+            try:
+                call(prompt)
+                ok = True
+            except Exception:
+                ok = False
+        with lock:
+            latencies.append(t.seconds)
+            failures += not ok
+
+    with common.Timer() as wall, ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, prompts))
+    return latencies, failures, wall.seconds
+
+
+def run(n_requests=200, distinct=120, concurrency=16, error_rate=0.2, latency=0.05, rpm=1200, tpm=1_000_000):
+    fake_llm = FakeLLM(latency=latency, error_rate=error_rate)
+    api_base = serve_in_background(fake_llm)
+    prompts = make_prompts(n_requests, distinct)
+    metrics = {"requests": n_requests, "distinct_prompts": len(set(prompts))}
+
+    import requests
+
+    session = requests.Session()
+
+    def direct(prompt):
+        response = session.post(f"{api_base}/completions", json={"model": "text-davinci-003", "prompt": prompt})
+        response.raise_for_status()
+        return response.json()["choices"][0]["text"]
+
+    latencies, failures, wall = _burst(direct, prompts, concurrency)
+    metrics.update(direct_failures=failures, direct_wall_s=round(wall, 4))
+    metrics.update(common.latency_summary(latencies, "direct_"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        gateway = LLMGateway(
+            api_base=api_base, api_key="sk-fake", requests_per_min=rpm, tokens_per_min=tpm,
+            cache_path=f"{tmp}/llm-cache.sqlite", backoff=0.05, max_backoff=1.0,
+        )
+        before = fake_llm.requests
+        hits_before = nassbot_metrics.CACHE_REQUESTS.value(cache="llm_prompt", result="hit")
+        latencies, failures, wall = _burst(gateway.complete, prompts, concurrency)
+        sent = fake_llm.requests - before
+        hits = nassbot_metrics.CACHE_REQUESTS.value(cache="llm_prompt", result="hit") - hits_before
+    metrics.update(
+        gateway_failures=failures,
+        gateway_wall_s=round(wall, 4),
+        gateway_upstream_requests=sent,
+        gateway_cache_hit_rate=round(hits / n_requests, 4),
+        gateway_upstream_rpm=round(sent / wall * 60, 1),
+        gateway_rpm_limit=rpm,
+    )
+    metrics.update(common.latency_summary(latencies, "gateway_"))
+    if failures:
+        raise LLMError(f"{failures} completions failed through the gateway")
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Completions in the burst.")
+    parser.add_argument("--distinct", type=int, default=120, help="Distinct prompts among them.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Completions requested at once.")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Fraction of requests the fake answers with 429.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake LLM latency in seconds.")
+    parser.add_argument("--rpm", type=float, default=1200, help="Requests/min the gateway allows.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    metrics = run(args.requests, args.distinct, args.concurrency, args.error_rate, args.latency, args.rpm)
+
+    return common.finish("llm_gateway", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""End-to-end load test of the Q&A request path against local fakes.
+
+Drives the backend at a fixed concurrency (closed loop) or a Poisson arrival
+rate (open loop) and reports throughput, latency percentiles, error rates and
+per-stage queue depth sampled from the backend's /metrics:
+
+    cd nassbot_app && python -m benchmarks.loadtest --spawn --rate 5 --duration 30
+    cd nassbot_app && python -m benchmarks.loadtest --spawn --mode bot --concurrency 16
+
+`--spawn` starts `fake_llm` and `fake_backend` as local processes; without
+it, point `--url` at an already running backend. `--mode bot` sends every
+request through `run_bot.runner`, as the Discord bot does.
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+
+import aiohttp
+
+from benchmarks import common
+from benchmarks.corpus import make_corpus
+
+METRIC_RE = re.compile(r'^(nassbot_stage_in_flight|nassbot_backend_queue_depth)(?:\{stage="([^"]*)"\})? (\S+)$')
+
+
+async def sample_queue_depth(session, metrics_url, interval, samples, state, stop):
+    """Periodically records client-side waiting requests and the backend's per-stage in-flight gauges."""
+    while not stop.is_set():
+        samples["client_queue"].append(state["waiting"])
+        try:
+            async with session.get(metrics_url) as response:
+                text = await response.text()
+            for line in text.splitlines():
+                match = METRIC_RE.match(line)
+                if match:
+                    _, stage, value = match.groups()
+                    key = f"in_flight_{stage}" if stage else "backend"
+                    samples[key].append(float(value))
+        except aiohttp.ClientError:
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def generate_load(send, questions, state, latencies, errors, concurrency, rate, duration, max_requests, seed=0):
+    """Sends questions until the duration or request budget runs out.
+
+    With a rate, arrivals are Poisson and requests beyond `concurrency`
+    outstanding wait client-side; without one, `concurrency` workers send
+    back to back.
+    """
+    rng = random.Random(seed)
+    slots = asyncio.Semaphore(concurrency)
+    deadline = time.monotonic() + duration
+
+    def budget_left():
+        return time.monotonic() < deadline and (not max_requests or state["sent"] < max_requests)
+
+    async def one():
+        request_id = state["sent"]
+        state["sent"] += 1
+        question = rng.choice(questions)["question"]
+        # latency counts from arrival, so time spent waiting for a slot is not hidden
+        start = time.perf_counter()
+        state["waiting"] += 1
+        async with slots:
+            state["waiting"] -= 1
+            try:
+                await send(question, request_id)
+            except Exception as e:
+                errors[type(e).__name__] += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+
+    async def closed_loop_worker():
+        while budget_left():
+            await one()
+
+    if not rate:
+        await asyncio.gather(*(closed_loop_worker() for _ in range(concurrency)))
+        return
+    tasks = []
+    while budget_left():
+        tasks.append(asyncio.create_task(one()))
+        await asyncio.sleep(rng.expovariate(rate))
+    await asyncio.gather(*tasks)
+
+
+async def run(args, questions):
+    base_url = args.url.rstrip("/")
+    samples = defaultdict(list)
+    stop = asyncio.Event()
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        if args.mode == "bot":
+            import run_bot
+
+            async def send(question, request_id):
+                await run_bot.runner(question, request_id=request_id, backend_url=base_url + "/")
+
+        else:
+
+            async def send(question, request_id):
+                params = {"query": question, "request_id": str(request_id)}
+                async with session.get(base_url + "/", params=params) as response:
+                    if response.status != 200:
+                        raise RuntimeError(f"HTTP {response.status}")
+                    await response.json()
+
+        state, latencies, errors = {"waiting": 0, "sent": 0}, [], Counter()
+        sampler = asyncio.create_task(
+            sample_queue_depth(session, base_url + "/metrics", args.sample_interval, samples, state, stop)
+        )
+        start = time.monotonic()
+        await generate_load(
+            send, questions, state, latencies, errors,
+            args.concurrency, args.rate, args.duration, args.requests, args.seed,
+        )
+        elapsed = time.monotonic() - start
+        stop.set()
+        await sampler
+
+    completed, failed = len(latencies), sum(errors.values())
+    metrics = {
+        "requests": completed + failed,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(completed / elapsed, 3),
+        "error_rate": round(failed / (completed + failed), 4) if completed + failed else 0.0,
+        "errors": dict(errors),
+    }
+    metrics.update(common.latency_summary(latencies, "latency_"))
+    for key, values in sorted(samples.items()):
+        metrics[f"queue_{key}_max"] = max(values)
+        metrics[f"queue_{key}_mean"] = round(sum(values) / len(values), 3)
+    return metrics
+
+
+def wait_until_up(url, timeout=300):
+    import urllib.request
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2)
+            return
+        except OSError:
+            time.sleep(1)
+    raise TimeoutError(f"{url} did not come up within {timeout}s")
+
+
+def spawn_fakes(args):
+    """Starts the fake LLM and fake backend on localhost and waits for them to be ready."""
+    llm_port, backend_port = args.port + 1, args.port
+    python = [sys.executable, "-m"]
+    processes = [
+        subprocess.Popen(python + [
+            "benchmarks.fake_llm", "--port", str(llm_port), "--latency", str(args.llm_latency),
+            "--jitter", str(args.llm_jitter), "--error-rate", str(args.llm_error_rate),
+        ]),
+        subprocess.Popen(python + [
+            "benchmarks.fake_backend", "--port", str(backend_port), "--workers", str(args.workers),
+            "--llm-url", f"http://127.0.0.1:{llm_port}/v1",
+        ], stdout=subprocess.DEVNULL),
+    ]
+    args.url = f"http://127.0.0.1:{backend_port}"
+    wait_until_up(args.url + "/metrics")
+    return processes
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["backend", "bot"], default="backend")
+    parser.add_argument("--url", default="http://127.0.0.1:8080", help="Backend to load when not spawning fakes.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum outstanding requests.")
+    parser.add_argument("--rate", type=float, default=0.0, help="Poisson arrivals per second; 0 for closed loop.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep sending requests.")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests; 0 for no limit.")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds.")
+    parser.add_argument("--sample-interval", type=float, default=0.5, help="Seconds between /metrics samples.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="Start the fake LLM and backend locally.")
+    parser.add_argument("--port", type=int, default=8080, help="Backend port when spawning; the LLM uses port+1.")
+    parser.add_argument("--workers", type=int, default=4, help="Backend workers when spawning.")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="Fake LLM latency when spawning.")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="Fake LLM jitter when spawning.")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fake LLM 429 rate when spawning.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    # run_bot reads these at import; the bot is never started here
+    for name in ("MODAL_USER_NAME", "DISCORD_DEV_ID", "DISCORD_PROD_ID"):
+        os.environ.setdefault(name, "loadtest")
+
+    _, questions = make_corpus(300, seed=0)
+    processes = spawn_fakes(args) if args.spawn else []
+    try:
+        metrics = asyncio.run(run(args, questions))
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    return common.finish(f"loadtest-{args.mode}", args, metrics, f"loadtest ({args.mode})")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""Document pipeline benchmark: full, resumed, no-op and incremental runs of the ETL DAG.
+
+Feeds the synthetic corpus through `utils.document_pipeline` with a simulated
+download latency and a fraction of downloads failing on the first run, then
+reruns it to resume, reruns it unchanged, and reruns it after editing a few
+documents, reporting each run's wall time and the work every stage redid:
+
+    cd nassbot_app && python -m benchmarks.pipeline --docs 500 --fail-rate 0.05 --changed 0.02
+"""
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import common
+from benchmarks.corpus import make_corpus
+from utils.chunking import document_id
+from utils.document_pipeline import build_pipeline
+from utils.embedders import get_embedder
+from utils.pipeline import ArtifactStore, PipelineError
+from utils.vecstore import FaissVectorStore
+
+
+class FlakySource:
+    """Serves document "PDFs" with a delay, failing a fixed set of documents until `heal` is called."""
+
+    def __init__(self, documents, latency, failing):
+        self.documents = documents
+        self.by_id = {document_id(document): document for document in documents}
+        self.latency = latency
+        self.failing = set(failing)
+        self.fetches = 0
+        self._lock = threading.Lock()
+
+    def load_documents(self):
+        return [{key: value for key, value in document.items() if key != "text"} for document in self.documents]
+
+    def fetch_pdf(self, document):
+        with self._lock:
+            self.fetches += 1
+        time.sleep(self.latency)
+        doc_id = document_id(document)
+        if doc_id in self.failing:
+            raise ConnectionError(f"simulated download failure for {doc_id}")
+        return self.by_id[doc_id]["text"].encode("utf-8")
+
+    def heal(self):
+        self.failing.clear()
+
+
+def _extract_text(document, pdf_bytes):
+    return pdf_bytes.decode("utf-8") if pdf_bytes is not None else document["title"]
+
+
+def _run(pipeline, source):
+    fetches = source.fetches
+    with common.Timer() as t:
+        try:
+            stages = pipeline.run()
+            failed = 0
+        except PipelineError as e:
+            stages = e.args[1]["stages"]
+            failed = len(e.args[1]["failed"])
+    metrics = {"wall_s": round(t.seconds, 4), "failed_stages": failed, "downloads": source.fetches - fetches}
+    for stage, counts in stages.items():
+        metrics[f"{stage}_computed"] = counts.get("computed", 0)
+    return metrics
+
+
+def run(documents, latency=0.01, fail_rate=0.05, changed=0.02, workers=16, seed=0):
+    rng = random.Random(seed)
+    doc_ids = [document_id(document) for document in documents]
+    source = FlakySource(documents, latency, rng.sample(doc_ids, int(len(doc_ids) * fail_rate)))
+    metrics = {"documents": len(documents)}
+
+    with tempfile.TemporaryDirectory() as root:
+        vector_store = FaissVectorStore(
+            embedder=get_embedder("hash"), vector_dir=Path(root) / "vectors", index_name="benchmark"
+        )
+        vector_store.vector_dir.mkdir()
+        pipeline = build_pipeline(
+            ArtifactStore(Path(root) / "artifacts"), source.load_documents, source.fetch_pdf, _extract_text,
+            vector_store, tokenizer="chars", download_workers=workers,
+        )
+        runs = {"first": None, "resumed": source.heal, "unchanged": None, "incremental": None}
+        for name, before in runs.items():
+            if before:
+                before()
+            if name == "incremental":
+                for document in rng.sample(documents, max(1, int(len(documents) * changed))):
+                    document["text"] += "\n\nAmended at third reading."
+                    document["title"] += " (AMENDMENT)"
+            metrics.update({f"{name}_{key}": value for key, value in _run(pipeline, source).items()})
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500, help="Number of synthetic documents.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus, failures and edits.")
+    parser.add_argument("--latency", type=float, default=0.01, help="Simulated download latency in seconds.")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="Fraction of downloads failing on the first run.")
+    parser.add_argument("--changed", type=float, default=0.02, help="Fraction of documents edited before the last run.")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent downloads.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    documents, _ = make_corpus(args.docs, seed=args.seed)
+
+    metrics = run(documents, args.latency, args.fail_rate, args.changed, args.workers, args.seed)
+
+    return common.finish("pipeline", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""Profiler benchmark: the cost of sampling a request, and whether the profile points at the slow stage.
+
+Runs the embedding and retrieval half of the Q&A path over the synthetic
+corpus, followed by a simulated `--llm-latency` wait, with profiling off and
+with `utils.profiler` sampling at each `--intervals`. Reports the latency
+overhead, samples per request and the share of samples landing in the
+simulated LLM call, which should match its share of the request's time:
+
+    cd nassbot_app && python -m benchmarks.profiler --queries 200 --intervals 0.01 0.001
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks import common
+from benchmarks.corpus import make_corpus
+from benchmarks.retrieval import split_corpus
+from utils import profiler as nassbot_profiler
+from utils.chunking import get_text_splitter
+from utils.embedders import get_embedder
+from utils.vecstore import FaissVectorStore
+
+
+def simulated_llm(seconds):
+    time.sleep(seconds)
+
+
+def _answer(embedder, vector_index, question, llm_latency):
+    sources = vector_index.similarity_search_by_vector(embedder.embed_query(question), k=2)
+    simulated_llm(llm_latency)
+    return sources
+
+
+def run(documents, questions, intervals=(0.01, 0.001), llm_latency=0.02):
+    texts, ids, metadatas = split_corpus(documents, get_text_splitter("chars"))
+    embedder = get_embedder("hash")
+    metrics = {"queries": len(questions)}
+
+    with tempfile.TemporaryDirectory() as vector_dir:
+        vector_store = FaissVectorStore(embedder=embedder, vector_dir=vector_dir, index_name="benchmark")
+        vector_store.add_embedding(texts, embedder.encode(texts), ids, metadatas)
+        vector_index = vector_store.connect_to_vector_index()
+
+        latencies = []
+        for question in questions:
+            with common.Timer() as t:
+                _answer(embedder, vector_index, question["question"], llm_latency)
+            latencies.append(t.seconds)
+        baseline = sum(latencies) / len(latencies)
+        metrics.update(common.latency_summary(latencies, "off_"))
+
+        for interval in intervals:
+            name = f"interval_{interval * 1000:g}ms"
+            latencies, samples, in_llm = [], 0, 0
+            for question in questions:
+                profiler = nassbot_profiler.SamplingProfiler(interval=interval)
+                with common.Timer() as t:
+                    profiler.start()
+                    _answer(embedder, vector_index, question["question"], llm_latency)
+                    profiler.stop()
+                latencies.append(t.seconds)
+                samples += profiler.samples
+                in_llm += sum(count for stack, count in profiler.stacks.items() if ":simulated_llm" in stack)
+            metrics.update(common.latency_summary(latencies, f"{name}_"))
+            mean = sum(latencies) / len(latencies)
+            metrics[f"{name}_overhead_pct"] = round((mean - baseline) / baseline * 100, 2)
+            metrics[f"{name}_samples_per_request"] = round(samples / len(questions), 1)
+            metrics[f"{name}_llm_sample_share"] = round(in_llm / samples, 4) if samples else 0.0
+        metrics["llm_time_share"] = round(llm_latency / baseline, 4)
+
+        with tempfile.TemporaryDirectory() as profile_dir:
+            for i, question in enumerate(questions[:20]):
+                with nassbot_profiler.profile_request(
+                    f"bench-{i}", enabled=True, threshold_s=0.0, profile_dir=profile_dir, keep=5
+                ):
+                    _answer(embedder, vector_index, question["question"], llm_latency)
+            metrics["profiles_kept_of_20_with_keep_5"] = len(os.listdir(profile_dir))
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=300, help="Number of synthetic documents.")
+    parser.add_argument("--queries", type=int, default=200, help="Questions answered per setting.")
+    parser.add_argument("--intervals", type=float, nargs="+", default=[0.01, 0.001], help="Sampling intervals in seconds.")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Simulated LLM latency in seconds.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    documents, questions = make_corpus(args.docs, seed=args.seed)
+
+    metrics = run(documents, questions[:args.queries], args.intervals, args.llm_latency)
+
+    return common.finish("profiler", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
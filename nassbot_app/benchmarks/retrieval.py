@@ -0,0 +1,124 @@
+"""Offline retrieval benchmark: splitting, embedding, index build, query latency and recall.
+
+Runs entirely locally against a synthetic (or fixture) corpus, so it is safe
+to run in CI with the hash embedder:
+
+    cd nassbot_app && python -m benchmarks.retrieval --embedder hash --tokenizer chars
+"""
+import argparse
+import sys
+import tempfile
+
+from benchmarks import common
+from benchmarks.corpus import load_corpus, make_corpus
+from utils.chunking import get_text_splitter, split_document
+from utils.embedders import get_embedder
+from utils.vecstore import FaissVectorStore
+
+
+def split_corpus(documents, text_splitter):
+    texts, ids, metadatas = [], [], []
+    for document in documents:
+        doc_texts, doc_ids, doc_metadatas = split_document(document, document["text"], text_splitter)
+        texts.extend(doc_texts)
+        ids.extend(doc_ids)
+        metadatas.extend(doc_metadatas)
+    return texts, ids, metadatas
+
+
+def recall(questions, results, k):
+    """Fraction of questions whose labelled document is among the top-k distinct retrieved documents."""
+    hits = 0
+    for question, retrieved in zip(questions, results):
+        doc_ids = list(dict.fromkeys(doc.metadata["doc_id"] for doc in retrieved))
+        hits += question["doc_id"] in doc_ids[:k]
+    return hits / len(questions) if questions else float("nan")
+
+
+def content_recall(questions, results, k):
+    """Fraction of questions whose answer sentence is in the text of one of the top-k chunks.
+
+    Unlike `recall`, this checks the text that is actually returned, so it
+    catches vectors resolving to the wrong chunk in the docstore.
+    """
+    labelled = [(q, retrieved) for q, retrieved in zip(questions, results) if q.get("answer")]
+    hits = sum(any(q["answer"] in doc.page_content for doc in retrieved[:k]) for q, retrieved in labelled)
+    return hits / len(labelled) if labelled else float("nan")
+
+
+def run(documents, questions, embedder_name="hash", tokenizer="chars", k=4, vector_dir=None):
+    metrics = {"documents": len(documents), "questions": len(questions)}
+    text_splitter = get_text_splitter(tokenizer)
+    corpus_chars = sum(len(document["text"]) for document in documents)
+
+    with common.Timer() as t:
+        texts, ids, metadatas = split_corpus(documents, text_splitter)
+    metrics.update(
+        chunks=len(texts),
+        split_s=round(t.seconds, 4),
+        split_docs_per_s=round(len(documents) / t.seconds, 2),
+        split_chars_per_s=round(corpus_chars / t.seconds, 2),
+    )
+
+    vector_store = FaissVectorStore(
+        embedder=get_embedder(embedder_name), vector_dir=vector_dir, index_name="benchmark"
+    )
+    with common.Timer() as t:
+        embeddings = vector_store.multi_encode_texts(texts)
+    metrics.update(embed_s=round(t.seconds, 4), embed_chunks_per_s=round(len(texts) / t.seconds, 2))
+
+    with common.Timer() as t:
+        vector_store.add_embedding(texts, embeddings, ids, metadatas)
+    metrics.update(index_build_s=round(t.seconds, 4), index_size_bytes=vector_store.index_size_bytes())
+
+    with common.Timer() as t:
+        vector_index = vector_store.connect_to_vector_index()
+    metrics.update(index_load_s=round(t.seconds, 4))
+
+    embed_latencies, search_latencies, query_latencies, results = [], [], [], []
+    for question in questions:
+        with common.Timer() as embed:
+            query_embedding = vector_store.lang_embedding_engine.embed_query(question["question"])
+        with common.Timer() as search:
+            results.append(vector_index.similarity_search_by_vector(query_embedding, k=k))
+        embed_latencies.append(embed.seconds)
+        search_latencies.append(search.seconds)
+        query_latencies.append(embed.seconds + search.seconds)
+
+    metrics.update(common.latency_summary(query_latencies, "query_"))
+    metrics.update(common.latency_summary(embed_latencies, "query_embed_"))
+    metrics.update(common.latency_summary(search_latencies, "query_search_"))
+    metrics.update(
+        recall_at_1=round(recall(questions, results, 1), 4),
+        recall_at_k=round(recall(questions, results, k), 4),
+        content_recall_at_k=round(content_recall(questions, results, k), 4),
+    )
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500, help="Number of synthetic documents.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus.")
+    parser.add_argument("--corpus", help="Fixture corpus JSON to use instead of a synthetic one.")
+    parser.add_argument("--embedder", default="hash", help='"hash" or a SentenceTransformer model name.')
+    parser.add_argument("--tokenizer", default="chars", choices=["chars", "tiktoken"])
+    parser.add_argument("--k", type=int, default=4, help="Number of chunks retrieved per query.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    if args.corpus:
+        documents, questions = load_corpus(args.corpus)
+    else:
+        documents, questions = make_corpus(args.docs, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as vector_dir:
+        metrics = run(documents, questions, args.embedder, args.tokenizer, args.k, vector_dir)
+
+    return common.finish("retrieval", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Sharded index benchmark: build time and query latency as the shard count grows.
+
+Builds the same synthetic corpus as 1, 2, 4 and 8 shards with the hash
+embedder and queries each through the scatter-gather `ShardedIndex` (a single
+shard is the plain FAISS index the backend serves today):
+
+    cd nassbot_app && python -m benchmarks.sharding --docs 1000 --shards 1 2 4 8
+"""
+import argparse
+import sys
+import tempfile
+
+from benchmarks import common
+from benchmarks.corpus import load_corpus, make_corpus
+from benchmarks.retrieval import content_recall, recall, split_corpus
+from utils.chunking import get_text_splitter
+from utils.embedders import get_embedder
+from utils.vecstore import FaissVectorStore
+
+
+def run_shard_count(texts, embeddings, ids, metadatas, questions, embedder, n_shards, k, vector_dir):
+    vector_store = FaissVectorStore(embedder=embedder, vector_dir=vector_dir, index_name="benchmark")
+    with common.Timer() as t:
+        if n_shards > 1:
+            vector_store.add_sharded_embedding(texts, embeddings, ids, metadatas, n_shards)
+        else:
+            vector_store.add_embedding(texts, embeddings, ids, metadatas)
+    metrics = {"build_s": round(t.seconds, 4), "index_size_bytes": vector_store.index_size_bytes()}
+
+    with common.Timer() as t:
+        vector_index = vector_store.connect_to_vector_index()
+    metrics["load_s"] = round(t.seconds, 4)
+
+    query_embeddings = [vector_store.lang_embedding_engine.embed_query(q["question"]) for q in questions]
+    latencies, results = [], []
+    try:
+        for query_embedding in query_embeddings:
+            with common.Timer() as t:
+                results.append(vector_index.similarity_search_by_vector(query_embedding, k=k))
+            latencies.append(t.seconds)
+    finally:
+        if hasattr(vector_index, "close"):
+            vector_index.close()
+
+    metrics.update(common.latency_summary(latencies, "query_search_"))
+    metrics["recall_at_k"] = round(recall(questions, results, k), 4)
+    metrics["content_recall_at_k"] = round(content_recall(questions, results, k), 4)
+    return metrics
+
+
+def run(documents, questions, shard_counts=(1, 2, 4, 8), embedder_name="hash", tokenizer="chars", k=4):
+    texts, ids, metadatas = split_corpus(documents, get_text_splitter(tokenizer))
+    embedder = get_embedder(embedder_name)
+    embeddings = embedder.encode(texts)
+    metrics = {"documents": len(documents), "questions": len(questions), "chunks": len(texts)}
+
+    for n_shards in shard_counts:
+        with tempfile.TemporaryDirectory() as vector_dir:
+            shard_metrics = run_shard_count(
+                texts, embeddings, ids, metadatas, questions, embedder, n_shards, k, vector_dir
+            )
+        metrics.update({f"shards{n_shards}_{key}": value for key, value in shard_metrics.items()})
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1000, help="Number of synthetic documents.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus.")
+    parser.add_argument("--corpus", help="Fixture corpus JSON to use instead of a synthetic one.")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8], help="Shard counts to compare.")
+    parser.add_argument("--embedder", default="hash", help='"hash" or a SentenceTransformer model name.')
+    parser.add_argument("--tokenizer", default="chars", choices=["chars", "tiktoken"])
+    parser.add_argument("--k", type=int, default=4, help="Number of chunks retrieved per query.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    if args.corpus:
+        documents, questions = load_corpus(args.corpus)
+    else:
+        documents, questions = make_corpus(args.docs, seed=args.seed)
+
+    metrics = run(documents, questions, args.shards, args.embedder, args.tokenizer, args.k)
+
+    return common.finish("sharding", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
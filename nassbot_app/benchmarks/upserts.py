@@ -0,0 +1,107 @@
+"""Pinecone bulk-load benchmark against the in-process stand-in index.
+
+Upserts the precomputed embeddings of a synthetic corpus at several
+concurrency levels, with injected latency and failures, checks that every
+chunk landed with its text, then interrupts a load and resumes it from its
+checkpoint:
+
+    cd nassbot_app && python -m benchmarks.upserts --latency 0.05 --error-rate 0.05
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from benchmarks import common
+from benchmarks.corpus import load_corpus, make_corpus
+from benchmarks.fake_pinecone import FakePineconeIndex
+from benchmarks.retrieval import split_corpus
+from utils.chunking import get_text_splitter
+from utils.embedders import get_embedder
+from utils.upserts import bulk_upsert
+
+
+def check_loaded(index, texts, ids):
+    """Raises unless every id is stored once, with its own text."""
+    stats = index.describe_index_stats()
+    if stats["total_vector_count"] != len(ids):
+        raise AssertionError(f"{stats['total_vector_count']} vectors stored, expected {len(ids)}")
+    stored = index.fetch(ids)["vectors"]
+    wrong = [chunk_id for chunk_id, text in zip(ids, texts) if stored[chunk_id]["metadata"]["text"] != text]
+    if wrong:
+        raise AssertionError(f"{len(wrong)} vectors carry the wrong text, e.g. {wrong[0]}")
+
+
+def run(documents, concurrencies=(1, 4, 16), batch_size=100, latency=0.05, error_rate=0.05, backoff=0.05):
+    texts, ids, metadatas = split_corpus(documents, get_text_splitter("chars"))
+    embedder = get_embedder("hash")
+    embeddings = embedder.encode(texts)
+    dimension = embeddings.shape[1]
+    metrics = {"documents": len(documents), "chunks": len(texts), "batches": -(-len(ids) // batch_size)}
+
+    for concurrency in concurrencies:
+        index = FakePineconeIndex(dimension, latency=latency, error_rate=error_rate)
+        with common.Timer() as t:
+            counts = bulk_upsert(
+                index, texts, embeddings, ids, metadatas, batch_size=batch_size, concurrency=concurrency,
+                backoff=backoff,
+            )
+        check_loaded(index, texts, ids)
+        metrics.update({
+            f"concurrency{concurrency}_load_s": round(t.seconds, 4),
+            f"concurrency{concurrency}_vectors_per_s": round(counts["upserted"] / t.seconds, 2),
+            f"concurrency{concurrency}_failed_attempts": index.failures,
+            f"concurrency{concurrency}_max_in_flight": index.max_in_flight,
+        })
+
+    # an outage halfway through, then a rerun from the checkpoint against the same index
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, "upsert.checkpoint")
+        index = FakePineconeIndex(dimension, latency=latency, fail_after=metrics["batches"] // 2)
+        # one batch at a time so the outage starts at a predictable point
+        interrupted = bulk_upsert(
+            index, texts, embeddings, ids, metadatas, batch_size=batch_size, concurrency=1,
+            max_retries=1, backoff=backoff, checkpoint=checkpoint,
+        )
+        index.fail_after = None
+        with common.Timer() as t:
+            resumed = bulk_upsert(
+                index, texts, embeddings, ids, metadatas, batch_size=batch_size, concurrency=max(concurrencies),
+                backoff=backoff, checkpoint=checkpoint,
+            )
+        check_loaded(index, texts, ids)
+    metrics.update(
+        resume_failed_before=interrupted["failed"],
+        resume_skipped=resumed["skipped"],
+        resume_upserted=resumed["upserted"],
+        resume_s=round(t.seconds, 4),
+    )
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500, help="Number of synthetic documents.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic corpus.")
+    parser.add_argument("--corpus", help="Fixture corpus JSON to use instead of a synthetic one.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Upserts in flight.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Vectors per upsert.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per upsert request.")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fraction of upserts that fail.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    if args.corpus:
+        documents, _ = load_corpus(args.corpus)
+    else:
+        documents, _ = make_corpus(args.docs, seed=args.seed)
+
+    metrics = run(documents, args.concurrency, args.batch_size, args.latency, args.error_rate)
+
+    return common.finish("upserts", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Warm-up benchmark: the first traffic on a new container, with and without replaying the query log.
+
+Records a history of questions drawn from a Zipf distribution into the query
+log, then serves fresh traffic from the same distribution on a cold container
+and on one that ran `qa_chain.warm_up` first, each in its own process with an
+empty prompt cache (as after a re-index, when every prompt's sources change).
+The LLM is `fake_llm`, served in the parent process:
+
+    cd nassbot_app && python -m benchmarks.warmup --history 500 --traffic 200 --warmup-questions 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from multiprocessing import get_context
+
+from benchmarks import common
+from benchmarks.corpus import make_corpus
+from benchmarks.fake_llm import FakeLLM
+from benchmarks.llm_gateway import serve_in_background
+
+
+def zipf_stream(questions, n, s=1.1, seed=0):
+    rng = random.Random(seed)
+    weights = [1 / rank ** s for rank in range(1, len(questions) + 1)]
+    return rng.choices(questions, weights, k=n)
+
+
+def _serve_traffic(env, traffic, warm, n_questions, budget_s):
+    """Runs in a fresh process, so models, indexes and module-level caches start cold."""
+    os.environ.update(env)
+    from chains import qa_chain
+    from utils import metrics
+
+    report = qa_chain.warm_up(n_questions, budget_s) if warm else {}
+    latencies, results = [], {"cached": 0, "computed": 0, "fast_path": 0}
+    for question in traffic:
+        with common.Timer() as t, metrics.trace() as trace:
+            qa_chain.qanda_langchain(question)
+        latencies.append(t.seconds)
+        if not any(span["stage"] == "llm" for span in trace.spans):
+            results["fast_path"] += 1
+        else:
+            results["cached" if trace.caches.get("llm_prompt") == "hit" else "computed"] += 1
+    reached_llm = results["cached"] + results["computed"]
+    return {
+        "first_request_ms": round(latencies[0] * 1000, 3),
+        **common.latency_summary(latencies, "traffic_"),
+        "traffic_llm_cache_hit_rate": round(results["cached"] / reached_llm, 4) if reached_llm else 0.0,
+        **{f"warmup_{key}": value for key, value in report.items() if key != "questions"},
+    }
+
+
+def run(n_docs=300, history=500, traffic=200, n_questions=20, budget_s=60.0, latency=0.2, seed=0):
+    from benchmarks.fake_backend import INDEX_NAME, build_fixture_index
+
+    _, questions = make_corpus(n_docs, seed=seed)
+    questions = [question["question"] for question in questions]
+    random.Random(seed).shuffle(questions)
+    api_base = serve_in_background(FakeLLM(latency=latency, error_rate=0.0))
+    metrics = {"history": history, "traffic": traffic}
+
+    with tempfile.TemporaryDirectory() as vector_dir:
+        env = {
+            "VECTOR_DIR": vector_dir,
+            "INDEX_NAME": INDEX_NAME,
+            "EMBEDDER": "hash",
+            "OPENAI_API_BASE": api_base,
+            "OPENAI_API_KEY": "sk-fake",
+            "QUERY_LOG_PATH": os.path.join(vector_dir, "query-log.sqlite"),
+            "LLM_REQUESTS_PER_MIN": "1000000",
+            "LLM_TOKENS_PER_MIN": "1000000000",
+        }
+        build_fixture_index(vector_dir, n_docs, seed)
+        os.environ.update(env)
+        from utils.query_log import QueryLog
+
+        query_log = QueryLog(env["QUERY_LOG_PATH"], max_queue=history)
+        for question in zipf_stream(questions, history, seed=seed):
+            query_log.record(question)
+        query_log.close()
+
+        stream = zipf_stream(questions, traffic, seed=seed + 1)
+        for scenario, warm in (("cold", False), ("warm", True)):
+            env["LLM_CACHE_PATH"] = os.path.join(vector_dir, f"llm-cache-{scenario}.sqlite")
+            # the spawned process re-imports this module, and with it modules that read the environment
+            os.environ.update(env)
+            with get_context("spawn").Pool(1) as pool:
+                scenario_metrics = pool.apply(_serve_traffic, (env, stream, warm, n_questions, budget_s))
+            metrics.update({f"{scenario}_{key}": value for key, value in scenario_metrics.items()})
+    return metrics
+
+
+def make_argparser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=300, help="Synthetic documents in the fixture index.")
+    parser.add_argument("--history", type=int, default=500, help="Questions recorded in the query log beforehand.")
+    parser.add_argument("--traffic", type=int, default=200, help="Questions served after the container starts.")
+    parser.add_argument("--warmup-questions", type=int, default=20, help="Most frequent questions replayed.")
+    parser.add_argument("--budget", type=float, default=60.0, help="Warm-up time budget in seconds.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake LLM latency in seconds.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the corpus and question streams.")
+    return common.add_result_args(parser)
+
+
+def main(argv=None):
+    args = make_argparser().parse_args(argv)
+    metrics = run(
+        args.docs, args.history, args.traffic, args.warmup_questions, args.budget, args.latency, args.seed
+    )
+
+    return common.finish("warmup", args, metrics)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
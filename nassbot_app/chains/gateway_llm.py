@@ -0,0 +1,18 @@
+from typing import Any, List, Optional
+
+from langchain.llms.base import LLM
+
+
+class GatewayLLM(LLM):
+    """LangChain LLM that sends completions through the container's `utils.llm_gateway.LLMGateway`."""
+
+    gateway: Any
+    max_tokens: int = 256
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "nassbot_gateway"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None) -> str:
+        return self.gateway.complete(prompt, max_tokens=self.max_tokens, temperature=self.temperature, stop=stop)
@@ -1,5 +1,84 @@
+import os
+import threading
+import time
+
 from langchain.chains.qa_with_sources import load_qa_with_sources_chain
-from langchain.llms import OpenAI
+
+_lock = threading.Lock()
+_vector_store = None
+_index_swapper = None
+_qa_chain = None
+
+WARMUP_QUESTIONS = int(os.environ.get("WARMUP_QUESTIONS", 20))
+WARMUP_BUDGET_S = float(os.environ.get("WARMUP_BUDGET_S", 60))
+
+
+def get_vector_store():
+    """Loads the embedding model once per container and reuses it."""
+    global _vector_store
+    from utils import metrics
+    from utils import vecstore
+
+    cached = _vector_store is not None
+    metrics.cache_lookup("embedding_model", cached)
+    if not cached:
+        with _lock, metrics.span("model_load"):
+            if _vector_store is None:
+                _vector_store = vecstore.FaissVectorStore()
+    return _vector_store
+
+
+def load_indexes(vector_store, vector_dir=None):
+    """Loads the FAISS index and, if one was built, the bill index from a directory."""
+    from utils import metrics
+    from utils import utils
+    from utils.bill_index import BillIndex
+
+    utils.pretty_log(f"connecting to vector storage at {vector_dir or vector_store.vector_dir}")
+    with metrics.span("index_load"):
+        vector_index = vector_store.connect_to_vector_index(vector_dir)
+        bill_index_path = vector_store.bill_index_path(vector_dir)
+        bill_index = BillIndex.load(bill_index_path) if bill_index_path.exists() else None
+    utils.pretty_log("connected to vector storage")
+    return vector_index, bill_index
+
+
+def unload_indexes(indexes):
+    """Releases what a replaced index version holds beyond memory, i.e. shard worker processes."""
+    vector_index, _ = indexes
+    if hasattr(vector_index, "close"):
+        vector_index.close()
+
+
+def get_indexes():
+    """Returns the vector store, FAISS index and bill index, following newly published versions."""
+    global _index_swapper
+    from utils import metrics
+    from utils import vecstore
+    from utils.index_versions import HotSwapper, VersionedIndex
+
+    vector_store = get_vector_store()
+    with _lock:
+        if _index_swapper is None:
+            versioned_index = VersionedIndex(vecstore.VECTOR_DIR, vecstore.INDEX_NAME)
+            _index_swapper = HotSwapper(
+                versioned_index, lambda vector_dir: load_indexes(vector_store, vector_dir), retire_fn=unload_indexes
+            )
+    metrics.cache_lookup("vector_index", _index_swapper.loaded)
+    _, (vector_index, bill_index) = _index_swapper.get()
+    return vector_store, vector_index, bill_index
+
+
+def get_qa_chain():
+    """Builds the sourced Q&A chain once per container, on top of the shared LLM gateway."""
+    global _qa_chain
+    from chains.gateway_llm import GatewayLLM
+    from utils.llm_gateway import get_gateway
+
+    with _lock:
+        if _qa_chain is None:
+            _qa_chain = load_qa_with_sources_chain(GatewayLLM(gateway=get_gateway()), chain_type="stuff")
+    return _qa_chain
 
 
 def qanda_langchain(query: str, request_id=None, with_logging=False) -> str:
@@ -12,19 +91,26 @@ def qanda_langchain(query: str, request_id=None, with_logging=False) -> str:
     """
     import sys
     sys.path.insert(1, '.../utils/utils')
+    from utils import metrics
     from utils import utils
-    from utils import vecstore
+    from chains import router
 
-    vector_store = vecstore.FaissVectorStore()
-    # embedding_engine = vecstore.lang_embedding_engine
-
-    utils.pretty_log("connecting to vector storage")
-    vector_index = vector_store.connect_to_vector_index()
-    utils.pretty_log("connected to vector storage")
+    vector_store, vector_index, bill_index = get_indexes()
 
     utils.pretty_log(f"running on query: {query}")
+    with metrics.span("fast_path"):
+        answer = router.route(query, bill_index)
+    metrics.FAST_PATH_REQUESTS.inc(result="answered" if answer else "fell_through")
+    if answer is not None:
+        utils.pretty_log("answered from bill metadata")
+        return answer
+
     utils.pretty_log("selecting sources by similarity to query")
-    sources = vector_index.similarity_search(query, k=2)
+    with metrics.span("embedding"):
+        query_embedding = vector_store.lang_embedding_engine.embed_query(query)
+    with metrics.span("retrieval"):
+        sources = vector_index.similarity_search_by_vector(query_embedding, k=2)
+    metrics.RETRIEVED_SOURCES.observe(len(sources))
 
     for source in sources:
         source.metadata['source'] = source.metadata['download_url']
@@ -35,18 +121,67 @@ def qanda_langchain(query: str, request_id=None, with_logging=False) -> str:
 
     utils.pretty_log("running query against Q&A chain")
 
-    llm = OpenAI(model_name="text-davinci-003", temperature=0)
-    chain = load_qa_with_sources_chain(llm, chain_type="stuff")
+    chain = get_qa_chain()
 
-    result = chain(
-        {"input_documents": sources, "question": query}, return_only_outputs=True
-    )
+    with metrics.span("llm"):
+        result = chain(
+            {"input_documents": sources, "question": query}, return_only_outputs=True
+        )
     answer = result["output_text"]
 
     if with_logging:
         print(answer)
         # utils.pretty_log("logging results to gantry")
-        # record_key = utils.log_event(query, sources, answer, request_id=request_id)
-        # utils.pretty_log(f"logged to gantry with key {record_key}")
+        # join_key = utils.log_event(query, sources, answer, request_id=request_id)
+        # utils.pretty_log(f"queued for gantry with join key {join_key}")
 
     return answer
+
+
+def warm_up(n_questions=WARMUP_QUESTIONS, budget_s=WARMUP_BUDGET_S):
+    """Replays the most frequently logged questions through the whole Q&A path.
+
+    Loads the embedding model and indexes, faults in the index pages the
+    common questions touch and fills the shared prompt cache, so the first
+    users after a deploy or on a new container are not the ones paying for
+    it. No new question is started once `budget_s` has passed.
+
+    Returns a report of what was replayed and the prompt cache's hit rate.
+    """
+    from utils import metrics
+    from utils import utils
+    from utils.query_log import get_query_log
+
+    start = time.monotonic()
+    get_indexes()
+    query_log = get_query_log()
+    questions = query_log.top_questions(n_questions) if query_log else []
+
+    results = {"cached": 0, "computed": 0, "fast_path": 0, "error": 0}
+    for question in questions:
+        if time.monotonic() - start > budget_s:
+            break
+        try:
+            with metrics.trace("warmup") as trace:
+                qanda_langchain(question)
+        except Exception as e:
+            utils.pretty_log(f"warm-up question failed: {e!r}")
+            result = "error"
+        else:
+            if not any(span["stage"] == "llm" for span in trace.spans):
+                result = "fast_path"
+            else:
+                result = "cached" if trace.caches.get("llm_prompt") == "hit" else "computed"
+        results[result] += 1
+        metrics.WARMUP_REPLAYS.inc(result=result)
+
+    reached_llm = results["cached"] + results["computed"]
+    report = {
+        "questions": len(questions),
+        "replayed": sum(results.values()),
+        **results,
+        "llm_cache_hit_rate": round(results["cached"] / reached_llm, 4) if reached_llm else None,
+        "seconds": round(time.monotonic() - start, 2),
+    }
+    utils.pretty_log(f"warm-up finished: {report}")
+    return report
@@ -0,0 +1,108 @@
+"""Intent router that answers sponsor and reading-status questions from the bill index.
+
+Anything it isn't confident about returns None so the caller falls through
+to the retrieval + LLM chain: a bill question is only answered when exactly
+one title contains every word of the bill's name.
+"""
+import re
+
+SPONSOR_PATTERNS = [
+    re.compile(r"\b(?:bills?|legislations?|motions?)\b.*?\bsponsored\s+by\s+(?P<name>.+)", re.I),
+    re.compile(r"\bwhat\s+(?:bills?|legislation)\s+(?:has|have|did)\s+(?P<name>.+?)\s+sponsor", re.I),
+]
+SPONSORED_BY_WHOM_PATTERNS = [
+    re.compile(r"\bwho\s+(?:sponsored|introduced|is\s+sponsoring)\s+(?:the\s+)?(?P<bill>.+)", re.I),
+    re.compile(r"\b(?:who\s+is|who's|who\s+was)\s+the\s+sponsor\s+of\s+(?:the\s+)?(?P<bill>.+)", re.I),
+    re.compile(r"\bwho\s+(?:was|is)\s+(?:the\s+)?(?P<bill>.+?)\s+sponsored\s+by", re.I),
+]
+READING_PATTERNS = [
+    re.compile(
+        r"\b(?:has|have|did|is)\s+(?:the\s+)?(?P<bill>.+?)\s+(?:bill\s+)?"
+        r"(?:passed|pass|gone\s+through|been\s+read\s+(?:a|for\s+the))\s+(?:the\s+)?(?P<stage>first|second|third)\s+reading",
+        re.I,
+    ),
+    re.compile(
+        r"\b(?:what\s+is|what's)\s+the\s+(?:reading\s+)?(?:status|progress)\s+of\s+(?:the\s+)?(?P<bill>.+)", re.I
+    ),
+    re.compile(r"\bhow\s+far\s+(?:has|is)\s+(?:the\s+)?(?P<bill>.+?)\s+(?:gone|progressed|got(?:ten)?)\b", re.I),
+]
+STAGES = ("first", "second", "third")
+# keeps sponsor answers within a Discord message
+MAX_LISTED = 15
+
+
+def _clean(fragment):
+    return fragment.strip(" ?.!\"'")
+
+
+def _status_line(bill):
+    parts = []
+    for stage in STAGES:
+        date = bill[f"{stage}_reading"]
+        parts.append(f"{stage} reading: {date or 'not recorded'}")
+    if bill["committee_referred"]:
+        parts.append(f"committee referred: {bill['committee_referred']}")
+    return "; ".join(parts)
+
+
+def _sources(bills):
+    return "SOURCES: " + ", ".join(bill["source"] for bill in bills)
+
+
+def answer_sponsor(bill_index, name):
+    bills = bill_index.by_sponsor(name)
+    if not bills:
+        return None
+    lines = [f"{len(bills)} bill(s) sponsored by {name}:"]
+    lines += [f"- {bill['title']} ({_status_line(bill)})" for bill in bills[:MAX_LISTED]]
+    if len(bills) > MAX_LISTED:
+        lines.append(f"...and {len(bills) - MAX_LISTED} more.")
+    return "\n".join(lines) + "\n" + _sources(bills[:MAX_LISTED])
+
+
+def _only_bill(bill_index, bill_name):
+    # several bills share most of a title ("Federal Medical Centre, Owo/Owerri/..."), so only answer for one
+    bills = bill_index.search_titles(bill_name, limit=2)
+    return bills[0] if len(bills) == 1 else None
+
+
+def answer_bill_sponsors(bill_index, bill_name):
+    bill = _only_bill(bill_index, bill_name)
+    # only bills with a recorded sponsor; otherwise the chain may still find one in the text
+    if bill is None or not bill["sponsors"]:
+        return None
+    return f"{bill['title']} was sponsored by {' and '.join(bill['sponsors'])}.\n" + _sources([bill])
+
+
+def answer_reading(bill_index, bill_name, stage=None):
+    bill = _only_bill(bill_index, bill_name)
+    if bill is None:
+        return None
+    if stage:
+        date = bill[f"{stage}_reading"]
+        verdict = f"passed {stage} reading on {date}" if date else f"has no recorded {stage} reading"
+        line = f"{bill['title']} {verdict} ({_status_line(bill)})."
+    else:
+        line = f"{bill['title']}: {_status_line(bill)}."
+    return line + "\n" + _sources([bill])
+
+
+def route(query, bill_index):
+    """Answers the query from structured bill metadata, or returns None to fall through."""
+    if bill_index is None:
+        return None
+    for pattern in SPONSOR_PATTERNS:
+        match = pattern.search(query)
+        if match:
+            return answer_sponsor(bill_index, _clean(match.group("name")))
+    for pattern in SPONSORED_BY_WHOM_PATTERNS:
+        match = pattern.search(query)
+        if match:
+            return answer_bill_sponsors(bill_index, _clean(match.group("bill")))
+    for pattern in READING_PATTERNS:
+        match = pattern.search(query)
+        if match:
+            groups = match.groupdict()
+            stage = groups.get("stage")
+            return answer_reading(bill_index, _clean(groups["bill"]), stage.lower() if stage else None)
+    return None
@@ -1,6 +1,8 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from utils.modal_utils import stub, image
 from utils.utils import vector_storage, VECTOR_DIR
+from utils import metrics
 from chains.qa_chain import qanda_langchain
 
 import modal
@@ -15,6 +17,12 @@ async def root():
     return {"message": "Hello World"}
 
 
+@web_app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Exposes the Gradio container's metrics; the Q&A backend serves its own at `nass-bot-hook/metrics`."""
+    return metrics.render()
+
+
 @stub.function(
     image=image,
     shared_volumes={
@@ -26,7 +34,8 @@ def fastapi_app():
     """A simple Gradio interface for debugging."""
 
     def chain_with_logging(*args, **kwargs):
-        return qanda_langchain(*args, with_logging=True, **kwargs)
+        with metrics.trace(), metrics.span("gradio"):
+            return qanda_langchain(*args, with_logging=True, **kwargs)
 
     interface = gr.Interface(
         fn=chain_with_logging,
@@ -22,12 +22,12 @@ guild_ids = {
 START, END = "\033[1;36m", "\033[0m"
 
 
-async def runner(query, request_id=None):
+async def runner(query, request_id=None, backend_url=BACKEND_URL):
     payload = {"query": query}
     if request_id:
         payload["request_id"] = request_id
     async with aiohttp.ClientSession() as session:
-        async with session.get(url=BACKEND_URL, params=payload) as response:
+        async with session.get(url=backend_url, params=payload) as response:
             assert response.status == 200
             json_content = await response.json()
     return json_content["answer"]
@@ -0,0 +1,69 @@
+"""Table-driven checks that `chains.router.route` answers only when it has exactly one right bill.
+
+    cd nassbot_app && python -m unittest discover tests
+"""
+import unittest
+
+from chains.router import route
+from utils.bill_index import BillIndex
+
+
+def _bill(doc_id, title, sponsors=(), first="", second="", third=""):
+    return {
+        "doc_id": doc_id, "title": title, "chamber": "House of Representatives", "first_reading": first,
+        "second_reading": second, "third_reading": third, "committee_referred": "", "sponsors": list(sponsors),
+        "source": f"https://nass.gov.ng/documents/billdownload/{doc_id}.pdf",
+    }
+
+
+BILLS = BillIndex([
+    _bill("1", "Federal College of Agriculture Ise-Orun (Establishment) Bill, 2019 (HB. 410)",
+          ["Hon. Ibrahim Olanrewaju"], "2019-10-29", "2020-03-10"),
+    _bill("2", "Federal College of Education, Gbongan (Establishment) Bill, 2019 (HB. 363)",
+          ["Hon. Taiwo Oluga"], "2019-10-09"),
+    _bill("3", "Federal College of Education, Birniwa (Establishment) Bill, 2019 (HB. 383)", [], "2019-10-10"),
+    _bill("4", "Federal Medical Centre, Owo (Establishment) Bill, 2019 (HB. 272)", ["Sen. Ajayi Boroffice"],
+          "2019-07-24", "2019-11-05"),
+    _bill("5", "Federal Medical Centre, Owerri (Establishment) Bill, 2019 (HB. 271)", [], "2019-07-24"),
+    _bill("6", "Federal Medical Centres (Establishment) Bill, 2019 (HB. 182)", [], "2019-07-18"),
+    _bill("7", "Federal Medical Centres (Est, etc) Bill, 2019 (SB. 94)", [], "2019-10-10"),
+])
+
+# question → a line the answer must contain, or None when the router must fall through
+CASES = [
+    ("Who sponsored the Federal College of Education bill?", None),
+    ("Has the Federal College of Education bill passed second reading?", None),
+    ("Who sponsored the Federal College of Education Gbongan bill?", "was sponsored by Hon. Taiwo Oluga"),
+    ("Who sponsored the Federal College of Agriculture Ise-Orun bill?", "was sponsored by Hon. Ibrahim Olanrewaju"),
+    ("Who sponsored the Federal College of Education Birniwa bill?", None),
+    ("Who is the sponsor of the Federal Medical Centre bill?", None),
+    ("Who sponsored the Federal Medical Centre Owo bill?", "was sponsored by Sen. Ajayi Boroffice"),
+    ("Has the Federal Medical Centre Owo bill passed second reading?", "passed second reading on 2019-11-05"),
+    ("Has the Federal Medical Centre Owerri bill passed second reading?", "has no recorded second reading"),
+    ("Has the Federal Medical Centre Ikeja bill passed second reading?", None),
+    ("What is the status of the Federal Medical Centres bill?", None),
+    ("How far has the Federal University of Agriculture bill gone?", None),
+    ("What bills has Ajayi Boroffice sponsored?", "1 bill(s) sponsored by Ajayi Boroffice"),
+    ("Bills sponsored by Senator Ajayi Boroffice", "Federal Medical Centre, Owo"),
+    ("What bills has Nobody Known sponsored?", None),
+    ("What does the Federal Medical Centre Owo bill provide for?", None),
+]
+
+
+class RouteTest(unittest.TestCase):
+    def test_route(self):
+        for question, expected in CASES:
+            with self.subTest(question=question):
+                answer = route(question, BILLS)
+                if expected is None:
+                    self.assertIsNone(answer)
+                else:
+                    self.assertIsNotNone(answer)
+                    self.assertIn(expected, answer)
+
+    def test_no_index_falls_through(self):
+        self.assertIsNone(route("Who sponsored the Federal Medical Centre Owo bill?", None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""In-memory inverted index over bill titles, sponsors and reading metadata.
+
+Built at index time from the documents `scrape_page` stores in Mongo, so
+questions about who sponsored a bill or how far it has got can be answered
+without a vector search or an LLM call.
+"""
+import json
+import re
+from collections import defaultdict
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+TITLE_STOPWORDS = {
+    "a", "an", "and", "act", "acts", "bill", "bills", "by", "for", "in", "of", "on", "other", "the", "to",
+    "matters", "related", "connected", "therewith", "establish", "enact", "provide", "lfn", "cap",
+}
+HONORIFICS = {
+    "sen", "senator", "hon", "honourable", "honorable", "rt", "dr", "engr", "chief", "prof", "barr",
+    "distinguished", "alhaji", "mrs", "mr", "ms",
+}
+NAME = r"[A-Z][A-Za-z'\-]+\.?"
+SPONSOR_RE = re.compile(
+    rf"(?i:sponsored\s+by|sponsor\s*:)\s*((?:{NAME}[ \t]+){{0,3}}{NAME})"
+    rf"|\(((?:Sen|Hon|Senator)\.?[ \t]+(?:{NAME}[ \t]+){{0,3}}{NAME})\)"
+)
+
+
+def title_tokens(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in TITLE_STOPWORDS]
+
+
+def name_tokens(name):
+    return [token for token in TOKEN_RE.findall(name.lower()) if token not in HONORIFICS]
+
+
+def extract_sponsors(text, limit=2000):
+    """Finds sponsor names such as "Sponsored by Sen. Ibrahim Gobir" near the top of a bill."""
+    sponsors = []
+    for match in SPONSOR_RE.finditer(text[:limit]):
+        name = " ".join((match.group(1) or match.group(2)).split())
+        if name_tokens(name) and name not in sponsors:
+            sponsors.append(name)
+    return sponsors
+
+
+def _date(value):
+    # the site stores some readings as "2021-11-30 00:00:00"
+    return (value or "").strip().split(" ")[0]
+
+
+class BillIndex:
+    """Bills as flat records plus token → record ordinal postings for titles and sponsors."""
+
+    def __init__(self, bills):
+        self.bills = bills
+        self.title_postings = defaultdict(set)
+        self.sponsor_postings = defaultdict(set)
+        for ordinal, bill in enumerate(bills):
+            for token in title_tokens(bill["title"]):
+                self.title_postings[token].add(ordinal)
+            for sponsor in bill["sponsors"]:
+                for token in name_tokens(sponsor):
+                    self.sponsor_postings[token].add(ordinal)
+
+    @classmethod
+    def from_documents(cls, documents, texts=None):
+        """Builds the index from Mongo bill documents.
+
+        Arguments:
+            documents: Records as stored by `scrape_page`; non-bill documents are skipped.
+            texts: Optional mapping of `chunking.document_id` to extracted text, used to find sponsors.
+        """
+        from .chunking import document_id
+
+        texts = texts or {}
+        bills = []
+        for document in documents:
+            if document.get("doc_type") != "bills":
+                continue
+            metadata = document["metadata"]
+            sponsors = [metadata["sponsor"]] if metadata.get("sponsor") else []
+            sponsors += [s for s in extract_sponsors(texts.get(document_id(document), "")) if s not in sponsors]
+            bills.append({
+                "doc_id": metadata["doc_id"],
+                "title": " ".join(document["title"].split()),
+                "chamber": metadata.get("chamber", ""),
+                "first_reading": _date(metadata.get("first_reading")),
+                "second_reading": _date(metadata.get("second_reading")),
+                "third_reading": _date(metadata.get("third_reading")),
+                "committee_referred": (metadata.get("commitee_referred") or "").strip(),
+                "sponsors": sponsors,
+                "source": metadata["download_url"],
+            })
+        return cls(bills)
+
+    def by_sponsor(self, name):
+        """Returns bills whose sponsor matches every token of the name, ignoring honorifics."""
+        tokens = name_tokens(name)
+        if not tokens:
+            return []
+        ordinals = set.intersection(*(self.sponsor_postings.get(token, set()) for token in tokens))
+        return [self.bills[ordinal] for ordinal in sorted(ordinals)]
+
+    def search_titles(self, query, limit=3):
+        """Returns the bills whose titles contain every token of the query, closest title first.
+
+        A query token no title contains matches nothing, so "Federal College of
+        Education" never settles for a Federal College of Agriculture.
+        """
+        tokens = set(title_tokens(query))
+        if not tokens:
+            return []
+        ordinals = set.intersection(*(self.title_postings.get(token, set()) for token in tokens))
+        # fewest extra title tokens first, so the exact title leads its amendments
+        ranked = sorted(ordinals, key=lambda ordinal: (len(set(title_tokens(self.bills[ordinal]["title"]))), ordinal))
+        return [self.bills[ordinal] for ordinal in ranked[:limit]]
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump({"bills": self.bills}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f)["bills"])
@@ -0,0 +1,136 @@
+"""Compact, normalized storage for the chunks behind a FAISS index.
+
+LangChain's FAISS wrapper pickles one `Document` per chunk, each with its
+own metadata dict. Here metadata is stored once per document, chunks are two
+integer arrays (document ordinal and text offset) and all chunk texts sit in
+one UTF-8 buffer, so nothing per-chunk is a Python object until a search
+returns it:
+
+    {index_name}.faiss         the vectors, row i is chunk i
+    {index_name}.docs.json     document ids and metadata, one entry per document
+    {index_name}.chunks.npy    int64 [n_chunks, 2]: document ordinal, end offset in the text buffer
+    {index_name}.texts.bin     every chunk's text, concatenated
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .chunking import parent_document_id
+
+
+def docs_path(vector_dir, index_name):
+    return Path(vector_dir) / f"{index_name}.docs.json"
+
+
+class ChunkStore:
+    """Chunk texts and document metadata addressed by FAISS row.
+
+    Arguments:
+        doc_ids: The `document_id` of each document.
+        doc_metadatas: The metadata of each document, stored once.
+        chunks: int64 array of (document ordinal, end offset) per chunk.
+        texts: The concatenated UTF-8 chunk texts, as bytes or a memory map.
+    """
+
+    def __init__(self, doc_ids, doc_metadatas, chunks, texts):
+        self.doc_ids = doc_ids
+        self.doc_metadatas = doc_metadatas
+        self.chunks = chunks
+        self.texts = texts
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @classmethod
+    def from_chunks(cls, texts, ids, metadatas):
+        """Normalizes parallel chunk lists, as returned by `chunking.split_document`, by document."""
+        doc_ids, doc_metadatas, ordinals = [], [], {}
+        chunks = np.empty((len(texts), 2), dtype=np.int64)
+        buffer, end = [], 0
+        for i, (text, chunk_id, metadata) in enumerate(zip(texts, ids, metadatas)):
+            doc_id = parent_document_id(chunk_id)
+            if doc_id not in ordinals:
+                ordinals[doc_id] = len(doc_ids)
+                doc_ids.append(doc_id)
+                doc_metadatas.append(metadata)
+            encoded = text.encode("utf-8")
+            end += len(encoded)
+            buffer.append(encoded)
+            chunks[i] = (ordinals[doc_id], end)
+        return cls(doc_ids, doc_metadatas, chunks, b"".join(buffer))
+
+    def text(self, i):
+        start = self.chunks[i - 1, 1] if i else 0
+        return bytes(self.texts[start:self.chunks[i, 1]]).decode("utf-8")
+
+    def metadata(self, i):
+        # a copy, since callers such as the Q&A chain add keys to what they get back
+        return dict(self.doc_metadatas[self.chunks[i, 0]])
+
+    def document(self, i):
+        from langchain.docstore.document import Document
+
+        return Document(page_content=self.text(i), metadata=self.metadata(i))
+
+    def save(self, vector_dir, index_name):
+        vector_dir = Path(vector_dir)
+        docs = {"doc_ids": self.doc_ids, "metadatas": self.doc_metadatas}
+        docs_path(vector_dir, index_name).write_text(json.dumps(docs))
+        np.save(vector_dir / f"{index_name}.chunks.npy", self.chunks)
+        (vector_dir / f"{index_name}.texts.bin").write_bytes(bytes(self.texts))
+
+    @classmethod
+    def load(cls, vector_dir, index_name, mmap=True):
+        """Loads a store; with `mmap` the chunk texts stay on disk until a hit reads them."""
+        vector_dir = Path(vector_dir)
+        docs = json.loads(docs_path(vector_dir, index_name).read_text())
+        chunks = np.load(vector_dir / f"{index_name}.chunks.npy")
+        texts_path = vector_dir / f"{index_name}.texts.bin"
+        if mmap and texts_path.stat().st_size:
+            texts = np.memmap(texts_path, dtype=np.uint8, mode="r")
+        else:
+            texts = texts_path.read_bytes()
+        return cls(docs["doc_ids"], docs["metadatas"], chunks, texts)
+
+
+class CompactFaissIndex:
+    """A raw FAISS index plus a `ChunkStore`, with the search methods of the LangChain wrapper the chain uses."""
+
+    def __init__(self, index, store, embedding_engine):
+        self.index = index
+        self.store = store
+        self.embedding_engine = embedding_engine
+
+    @classmethod
+    def build(cls, texts, embeddings, ids, metadatas, embedding_engine):
+        import faiss
+
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors)
+        return cls(index, ChunkStore.from_chunks(texts, ids, metadatas), embedding_engine)
+
+    def save(self, vector_dir, index_name):
+        import faiss
+
+        faiss.write_index(self.index, str(Path(vector_dir) / f"{index_name}.faiss"))
+        self.store.save(vector_dir, index_name)
+
+    @classmethod
+    def load(cls, vector_dir, index_name, embedding_engine):
+        import faiss
+
+        index = faiss.read_index(str(Path(vector_dir) / f"{index_name}.faiss"))
+        return cls(index, ChunkStore.load(vector_dir, index_name), embedding_engine)
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        query = np.asarray([embedding], dtype=np.float32)
+        scores, rows = self.index.search(query, k)
+        return [(self.store.document(row), float(score)) for score, row in zip(scores[0], rows[0]) if row != -1]
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query, k=4):
+        return self.similarity_search_by_vector(self.embedding_engine.embed_query(query), k)
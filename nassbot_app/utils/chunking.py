@@ -0,0 +1,53 @@
+"""Shared configuration for splitting documents into chunks before embedding."""
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+# rough characters-per-token ratio for English, used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+
+def get_text_splitter(tokenizer="tiktoken", chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Returns the splitter used for indexing.
+
+    Arguments:
+        tokenizer: "tiktoken" measures chunks in tokens, as in production.
+            "chars" approximates the same sizes in characters and needs no downloads.
+    """
+    if tokenizer == "tiktoken":
+        return RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap, allowed_special="all"
+        )
+    if tokenizer == "chars":
+        return RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size * CHARS_PER_TOKEN, chunk_overlap=chunk_overlap * CHARS_PER_TOKEN
+        )
+    raise ValueError(f"unknown tokenizer {tokenizer!r}")
+
+
+def document_id(document):
+    """The Mongo id of a document as a string, whether it came from Mongo or from the S3 JSON cache."""
+    _id = document["_id"]
+    if isinstance(_id, dict):
+        # bson.json_util serialises ObjectIds as {"$oid": "..."}
+        _id = _id.get("$oid", _id)
+    return str(_id)
+
+
+def chunk_id(doc_id, n):
+    """Id of the n-th chunk of a document. Vector stores key their docstores by id, so each chunk needs its own."""
+    return f"{doc_id}-{n}"
+
+
+def parent_document_id(chunk_id):
+    """The `document_id` of the document a chunk id belongs to."""
+    return chunk_id.rsplit("-", 1)[0]
+
+
+def split_document(document, text, text_splitter):
+    """Splits a document's text into chunks, each paired with its own chunk id and the document metadata."""
+    doc_texts = text_splitter.split_text(text)
+    doc_id = document_id(document)
+    ids = [chunk_id(doc_id, n) for n in range(len(doc_texts))]
+    metadata = [document["metadata"] for _ in range(len(doc_texts))]
+    return doc_texts, ids, metadata
@@ -0,0 +1,183 @@
+"""Compressed vector storage for the compact FAISS index, with exact rescoring.
+
+A compressed index searches small codes held in memory and then rescores
+the best `k * rescore` candidates with the full float32 vectors. Those are
+read from a memory-mapped file, so only the candidates' pages are touched:
+
+    "pca:128"     PCA to 128 dimensions, stored as float16
+    "trunc:192"   the first 192 dimensions, stored as float16
+    "binary"      one sign bit per dimension, searched by Hamming distance
+                  (see `SignCodes`)
+
+Files next to the `utils.chunk_store` layout:
+
+    {index_name}.faiss              the compressed index (a binary index for "binary")
+    {index_name}.full.f32           float32 [n_chunks, dim], read lazily for rescoring
+    {index_name}.compression.json   the spec, dimension, rescore factor and query encoding parameters
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .chunk_store import ChunkStore, CompactFaissIndex
+
+DEFAULT_RESCORE = 10
+
+
+def compression_path(vector_dir, index_name):
+    return Path(vector_dir) / f"{index_name}.compression.json"
+
+
+def parse_spec(spec):
+    """Splits a spec such as "pca:128" into ("pca", 128); "binary" has no dimension."""
+    kind, _, dim = spec.partition(":")
+    if kind == "binary" and not dim:
+        return kind, None
+    if kind in ("pca", "trunc") and dim.isdigit() and int(dim) > 0:
+        return kind, int(dim)
+    raise ValueError(f'unknown vector compression {spec!r}; use "pca:<dim>", "trunc:<dim>" or "binary"')
+
+
+class SignCodes:
+    """Packed sign bits of mean-centred vectors under a fixed random rotation.
+
+    Centring puts the threshold inside the data rather than at zero, and the
+    rotation spreads each dimension's variance over every bit, so sparse or
+    skewed embeddings do not collapse onto a few codes. The rotation is
+    regenerated from its seed, so only the mean is stored.
+    """
+
+    def __init__(self, mean, seed=0):
+        import faiss
+
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.seed = seed
+        self.rotation = faiss.RandomRotationMatrix(len(self.mean), len(self.mean))
+        self.rotation.init(seed)
+
+    @classmethod
+    def fit(cls, vectors, seed=0):
+        return cls(vectors.mean(axis=0), seed)
+
+    def __call__(self, vectors):
+        return np.packbits(self.rotation.apply(vectors - self.mean) > 0, axis=1)
+
+    def to_json(self):
+        return {"mean": self.mean.tolist(), "seed": self.seed}
+
+
+def _query_encoder(kind, dim, params=None):
+    if kind == "binary":
+        return SignCodes(**params)
+    if kind == "trunc":
+        return lambda vectors: np.ascontiguousarray(vectors[:, :dim])
+    # PCA is applied by the index's own transform
+    return lambda vectors: vectors
+
+
+def build_codes(spec, vectors):
+    """Trains and fills the compressed FAISS index for a float32 matrix.
+
+    Returns the index and the JSON parameters needed to encode queries for it.
+    """
+    import faiss
+
+    kind, dim = parse_spec(spec)
+    full_dim = vectors.shape[1]
+    if dim and dim > full_dim:
+        raise ValueError(f"cannot reduce {full_dim}-dimensional vectors to {dim}")
+    params = None
+    if kind == "binary":
+        encode = SignCodes.fit(vectors)
+        params = encode.to_json()
+        index = faiss.IndexBinaryFlat(full_dim + (-full_dim) % 8)
+    elif kind == "trunc":
+        encode = _query_encoder(kind, dim)
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+    else:
+        encode = _query_encoder(kind, dim)
+        index = faiss.IndexPreTransform(
+            faiss.PCAMatrix(full_dim, dim), faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16)
+        )
+        index.train(vectors)
+    index.add(encode(vectors))
+    return index, params
+
+
+class CompressedFaissIndex(CompactFaissIndex):
+    """A `CompactFaissIndex` whose in-memory vectors are compressed, rescored against the full ones on disk.
+
+    Arguments:
+        full_vectors_path: The float32 vectors, opened as a memory map on the first rescore.
+        rescore: Candidates rescored per result; 0 returns the approximate ranking as is.
+    """
+
+    def __init__(
+        self, index, store, embedding_engine, spec, params=None, full_vectors_path=None, rescore=DEFAULT_RESCORE
+    ):
+        super().__init__(index, store, embedding_engine)
+        self.spec = spec
+        self.kind, self.dim = parse_spec(spec)
+        self.params = params
+        self.encode = _query_encoder(self.kind, self.dim, params)
+        self.full_vectors_path = full_vectors_path
+        self.rescore = rescore
+        self._full = None
+        self._vectors = None
+
+    @classmethod
+    def build(cls, texts, embeddings, ids, metadatas, embedding_engine, spec="pca:128", rescore=DEFAULT_RESCORE):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        codes, params = build_codes(spec, vectors)
+        index = cls(codes, ChunkStore.from_chunks(texts, ids, metadatas), embedding_engine, spec, params, rescore=rescore)
+        # kept until saved, so a freshly built index can rescore before it has a file to map
+        index._vectors = vectors
+        return index
+
+    def save(self, vector_dir, index_name):
+        import faiss
+
+        vector_dir = Path(vector_dir)
+        write = faiss.write_index_binary if self.kind == "binary" else faiss.write_index
+        write(self.index, str(vector_dir / f"{index_name}.faiss"))
+        self.store.save(vector_dir, index_name)
+        self.full_vectors_path = vector_dir / f"{index_name}.full.f32"
+        self._vectors.tofile(self.full_vectors_path)
+        meta = {"spec": self.spec, "dim": self._vectors.shape[1], "rescore": self.rescore, "params": self.params}
+        compression_path(vector_dir, index_name).write_text(json.dumps(meta))
+        self._vectors = None
+
+    @classmethod
+    def load(cls, vector_dir, index_name, embedding_engine):
+        import faiss
+
+        vector_dir = Path(vector_dir)
+        meta = json.loads(compression_path(vector_dir, index_name).read_text())
+        kind, _ = parse_spec(meta["spec"])
+        read = faiss.read_index_binary if kind == "binary" else faiss.read_index
+        index = read(str(vector_dir / f"{index_name}.faiss"))
+        store = ChunkStore.load(vector_dir, index_name)
+        full_vectors_path = vector_dir / f"{index_name}.full.f32"
+        return cls(index, store, embedding_engine, meta["spec"], meta["params"], full_vectors_path, meta["rescore"])
+
+    def full_vectors(self):
+        if self._vectors is not None:
+            return self._vectors
+        if self._full is None:
+            self._full = np.memmap(self.full_vectors_path, dtype=np.float32, mode="r").reshape(len(self.store), -1)
+        return self._full
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        query = np.asarray([embedding], dtype=np.float32)
+        n_candidates = min(max(k, k * self.rescore), self.index.ntotal)
+        distances, rows = self.index.search(self.encode(query), n_candidates)
+        keep = rows[0] != -1
+        rows, distances = rows[0][keep], distances[0][keep].astype(np.float32)
+        if self.rescore:
+            # sorted rows read the memory map front to back
+            order = np.argsort(rows)
+            rows = rows[order]
+            distances = ((np.asarray(self.full_vectors()[rows]) - query) ** 2).sum(axis=1)
+        best = np.argsort(distances, kind="stable")[:k]
+        return [(self.store.document(int(rows[i])), float(distances[i])) for i in best]
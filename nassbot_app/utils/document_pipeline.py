@@ -0,0 +1,104 @@
+"""The scrape → download → extract → split → embed → index pipeline as a `utils.pipeline` DAG.
+
+    scrape ─ download ─ extract ─ split ─┬─ embed ─┬─ index
+                                         └─ bills ─┘
+
+Only `scrape` reaches outside the artifact store on every run. Each other
+stage reruns just for the documents whose inputs, code or config changed, and
+`index` publishes a new `VersionedIndex` version only when the embeddings or
+bills did. The sources are passed in, so the app can read Mongo and S3 while
+the benchmark feeds a synthetic corpus through the same stages.
+"""
+import copy
+
+import numpy as np
+
+from .chunking import CHUNK_OVERLAP, CHUNK_SIZE, document_id, get_text_splitter, split_document
+from .pipeline import Pipeline
+
+
+def build_pipeline(
+    store, load_documents, fetch_pdf, extract_text, vector_store, tokenizer="tiktoken", n_shards=1,
+    embed_batch_docs=256, download_workers=16, max_parallel_stages=4,
+):
+    """Wires the stages up over an `ArtifactStore`.
+
+    Arguments:
+        load_documents: Returns the records of the document store, as stored by `scrape_page`.
+        fetch_pdf: Returns a document's PDF bytes, or None if it has none.
+        extract_text: Returns the text of a document from its PDF bytes (which may be None).
+        vector_store: The `FaissVectorStore` to embed with and publish to; its
+            `vector_dir` is the root of the `VersionedIndex`. Run the pipeline
+            inside its `encoding_pool()` so embed batches share one encoding pool.
+    """
+    from .bill_index import BillIndex
+    from .index_versions import VersionedIndex
+
+    pipeline = Pipeline(store, max_parallel_stages=max_parallel_stages)
+    engine = vector_store.lang_embedding_engine
+    embedder_name = getattr(engine, "model_name", None) or type(engine).__name__
+
+    @pipeline.stage(always=True, keyed=True)
+    def scrape():
+        return {document_id(document): document for document in load_documents()}
+
+    @pipeline.stage(inputs=("scrape",), per_document=True, workers=download_workers)
+    def download(batch):
+        return {doc_id: fetch_pdf(inputs["scrape"]) for doc_id, inputs in batch.items()}
+
+    @pipeline.stage(inputs=("scrape", "download"), per_document=True, workers=download_workers)
+    def extract(batch):
+        return {doc_id: extract_text(inputs["scrape"], inputs["download"]) for doc_id, inputs in batch.items()}
+
+    split_config = {"tokenizer": tokenizer, "chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+    @pipeline.stage(inputs=("scrape", "extract"), per_document=True, config=split_config)
+    def split(batch):
+        text_splitter = get_text_splitter(tokenizer)
+        return {
+            doc_id: split_document(inputs["scrape"], inputs["extract"], text_splitter)
+            for doc_id, inputs in batch.items()
+        }
+
+    @pipeline.stage(inputs=("split",), per_document=True, batch_size=embed_batch_docs, config={"model": embedder_name})
+    def embed(batch):
+        doc_ids = list(batch)
+        texts = [text for doc_id in doc_ids for text in batch[doc_id]["split"][0]]
+        embeddings = np.asarray(vector_store.multi_encode_texts(texts), dtype=np.float32)
+        bounds = np.cumsum([0] + [len(batch[doc_id]["split"][0]) for doc_id in doc_ids])
+        return {doc_id: embeddings[start:end] for doc_id, start, end in zip(doc_ids, bounds, bounds[1:])}
+
+    @pipeline.stage(inputs=("scrape", "split"))
+    def bills(scrape, split):
+        # the first chunk holds the bill header, which is where sponsors are named
+        first_chunks = {doc_id: texts[0] for doc_id, (texts, _, _) in split.items() if texts}
+        return BillIndex.from_documents(scrape.values(), first_chunks).bills
+
+    index_config = {"n_shards": n_shards, "compact": vector_store.compact, "compression": vector_store.compression}
+
+    @pipeline.stage(inputs=("split", "embed", "bills"), config=index_config)
+    def index(split, embed, bills):
+        doc_ids = sorted(split)
+        texts = [text for doc_id in doc_ids for text in split[doc_id][0]]
+        ids = [chunk_id for doc_id in doc_ids for chunk_id in split[doc_id][1]]
+        metadatas = [metadata for doc_id in doc_ids for metadata in split[doc_id][2]]
+        embeddings = np.concatenate([embed[doc_id] for doc_id in doc_ids]) if doc_ids else np.zeros((0, 1))
+
+        # build the new version off to the side; serving containers keep using the live one
+        versioned_index = VersionedIndex(vector_store.vector_dir, vector_store.index_name)
+        version, staging_dir = versioned_index.stage()
+        staged_store = copy.copy(vector_store)
+        staged_store.vector_dir = staging_dir
+        if n_shards > 1:
+            staged_store.add_sharded_embedding(texts, embeddings, ids, metadatas, n_shards)
+        else:
+            staged_store.add_embedding(texts, embeddings, ids, metadatas)
+        BillIndex(bills).save(staged_store.bill_index_path())
+        versioned_index.publish(
+            version, staging_dir, documents=len(split), chunks=len(texts), bills=len(bills), n_shards=n_shards,
+            compression=index_config["compression"] if n_shards == 1 else None,
+        )
+        versioned_index.collect_garbage()
+        return {"version": version, "documents": len(split), "chunks": len(texts)}
+
+    return pipeline
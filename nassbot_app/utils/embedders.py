@@ -0,0 +1,81 @@
+"""Embedding engines that can be swapped into the vector stores.
+
+Every engine exposes the SentenceTransformer-style `encode` used for bulk
+indexing and the LangChain-style `embed_documents` / `embed_query` used by
+the FAISS wrapper, so callers don't need to know which one they were given.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_MODEL = "all-MiniLM-L6-v2"
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=1 << 16)
+def _feature_slot(feature, dim):
+    digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    return value % dim, 1.0 if value >> 63 else -1.0
+
+
+class HashEmbedder:
+    """Deterministic feature-hashing embedder for offline benchmarks and CI.
+
+    Unigrams and bigrams are hashed into a signed bag of words and L2-normalised,
+    so texts that share vocabulary land close together without any model download.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _embed(self, text):
+        tokens = TOKEN_RE.findall(text.lower())
+        vector = np.zeros(self.dim, dtype=np.float32)
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            slot, sign = _feature_slot(feature, self.dim)
+            vector[slot] += sign
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts, batch_size=64, **kwargs):
+        if isinstance(texts, str):
+            return self._embed(texts)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.stack([self._embed(text) for text in texts])
+
+    def embed_documents(self, texts):
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self._embed(text).tolist()
+
+
+class SentenceTransformerEmbedder:
+    """Wraps a SentenceTransformer so it also speaks the LangChain embeddings interface."""
+
+    def __init__(self, model=DEFAULT_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=64, **kwargs):
+        return self.model.encode(texts, batch_size=batch_size, **kwargs)
+
+    def embed_documents(self, texts):
+        return self.encode(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.encode(text).tolist()
+
+
+def get_embedder(name=DEFAULT_MODEL, **kwargs):
+    """Returns the hash embedder for "hash" and a SentenceTransformer model otherwise."""
+    if name == "hash":
+        return HashEmbedder(**kwargs)
+    return SentenceTransformerEmbedder(name)
@@ -0,0 +1,86 @@
+"""Background batching exporter that keeps event logging off the request path."""
+import atexit
+import queue
+import threading
+import time
+
+from . import metrics
+
+EXPORTED_EVENTS = metrics.Counter(
+    "nassbot_exported_events_total", "Events handed to an exporter, by outcome.", ("exporter", "outcome")
+)
+
+
+class BatchExporter:
+    """Buffers events in memory and ships them in batches from a daemon thread.
+
+    Arguments:
+        name: Label used in metrics and logs.
+        flush_fn: Called with a list of events; may raise, in which case the batch is dropped.
+        max_batch: Largest number of events sent in one call to flush_fn.
+        flush_interval: Seconds to wait for a batch to fill before sending a partial one.
+        max_queue: Events beyond this many pending are dropped rather than blocking callers.
+    """
+
+    def __init__(self, name, flush_fn, max_batch=50, flush_interval=5.0, max_queue=1000):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"{name}-exporter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, event):
+        """Enqueues an event without blocking; returns False if it had to be dropped."""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            EXPORTED_EVENTS.inc(exporter=self.name, outcome="dropped")
+            return False
+        return True
+
+    def _next_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, batch):
+        try:
+            self.flush_fn(batch)
+        except Exception as e:
+            EXPORTED_EVENTS.inc(len(batch), exporter=self.name, outcome="failed")
+            print(f"{self.name} exporter failed to send {len(batch)} events: {e!r}")
+        else:
+            EXPORTED_EVENTS.inc(len(batch), exporter=self.name, outcome="sent")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send(batch)
+
+    def close(self, timeout=10.0):
+        """Stops the worker and sends whatever is still queued."""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join(timeout=min(timeout, self.flush_interval + 1))
+        remaining = []
+        while True:
+            try:
+                remaining.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(remaining), self.max_batch):
+            self._send(remaining[start:start + self.max_batch])
@@ -0,0 +1,284 @@
+"""Versioned vector index directories with atomic publishing and hot swapping.
+
+Layout on the shared volume:
+
+    /vectors/{INDEX_NAME}/CURRENT                 name of the live version
+    /vectors/{INDEX_NAME}/versions/{version}/     index files + MANIFEST.json
+    /vectors/{INDEX_NAME}/leases/{version}/{id}   touched by every reader of a version
+
+A version is written into a staging directory, sealed with a manifest,
+renamed into place and only then made live by atomically replacing CURRENT,
+so readers never see a missing or half-written index.
+"""
+import hashlib
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import metrics
+
+MANIFEST = "MANIFEST.json"
+STAGING_PREFIX = ".staging-"
+
+INDEX_SWAPS = metrics.Counter("nassbot_index_swaps_total", "Index versions hot-swapped in, by outcome.", ("outcome",))
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def reader_id():
+    """Identifies this container (or process) when it takes a lease on a version."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class VersionedIndex:
+    """Publishes, resolves and garbage-collects versions of one named index."""
+
+    def __init__(self, root, index_name):
+        self.root = Path(root) / index_name
+        self.index_name = index_name
+        self.versions_dir = self.root / "versions"
+        self.leases_dir = self.root / "leases"
+        self.pointer = self.root / "CURRENT"
+
+    def current_version(self):
+        try:
+            return self.pointer.read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def version_dir(self, version):
+        return self.versions_dir / version
+
+    def read_manifest(self, version):
+        return json.loads((self.version_dir(version) / MANIFEST).read_text())
+
+    def stage(self, base_version=None):
+        """Creates a staging directory and returns (version, path).
+
+        The directory starts empty, or with the files of `base_version` when
+        only part of an index is being rebuilt. Base files are hard-linked where
+        the filesystem allows it, so a staged file must be replaced (unlinked,
+        or written elsewhere and `os.replace`d), never rewritten in place, or
+        the published version changes with it.
+        """
+        version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{uuid.uuid4().hex[:6]}"
+        staging_dir = self.versions_dir / f"{STAGING_PREFIX}{version}"
+        staging_dir.mkdir(parents=True)
+        if base_version:
+            for path in self.version_dir(base_version).iterdir():
+                if path.is_file() and path.name != MANIFEST:
+                    try:
+                        os.link(path, staging_dir / path.name)
+                    except OSError:
+                        shutil.copy2(path, staging_dir / path.name)
+        return version, staging_dir
+
+    def publish(self, version, staging_dir, **details):
+        """Seals a staged version with a manifest and makes it the live one.
+
+        Arguments:
+            version: The name returned by `stage`.
+            staging_dir: The directory returned by `stage`, with every index file written.
+            details: Extra JSON-serialisable facts recorded in the manifest, e.g. chunk counts.
+        """
+        staging_dir = Path(staging_dir)
+        files = {
+            path.name: {"bytes": path.stat().st_size, "sha256": _sha256(path)}
+            for path in sorted(staging_dir.iterdir())
+            if path.is_file() and path.name != MANIFEST
+        }
+        if not files:
+            raise ValueError(f"refusing to publish empty version {version}")
+        manifest = {
+            "version": version,
+            "index_name": self.index_name,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "files": files,
+            **details,
+        }
+        (staging_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+        version_dir = self.version_dir(version)
+        os.rename(staging_dir, version_dir)
+
+        tmp_pointer = self.root / f".CURRENT.{uuid.uuid4().hex}"
+        tmp_pointer.write_text(version)
+        os.replace(tmp_pointer, self.pointer)
+        return version_dir
+
+    def verify(self, version, hash_files=True):
+        """Checks that every file in a version's manifest is present with the recorded size and sha256.
+
+        Hashing reads every byte, including files that are memory-mapped
+        lazily, so loading passes `hash_files=False` to check sizes only.
+        """
+        manifest = self.read_manifest(version)
+        version_dir = self.version_dir(version)
+        for name, expected in manifest["files"].items():
+            path = version_dir / name
+            if not path.exists() or path.stat().st_size != expected["bytes"]:
+                return False
+            if hash_files and _sha256(path) != expected["sha256"]:
+                return False
+        return True
+
+    def touch_lease(self, version, reader=None):
+        lease = self.leases_dir / version / (reader or reader_id())
+        lease.parent.mkdir(parents=True, exist_ok=True)
+        lease.touch()
+
+    def release_lease(self, version, reader=None):
+        try:
+            (self.leases_dir / version / (reader or reader_id())).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _has_live_lease(self, version, lease_ttl):
+        lease_dir = self.leases_dir / version
+        if not lease_dir.exists():
+            return False
+        cutoff = time.time() - lease_ttl
+        return any(lease.stat().st_mtime >= cutoff for lease in lease_dir.iterdir())
+
+    def collect_garbage(self, keep=2, lease_ttl=600):
+        """Deletes old versions that nobody has read recently, and abandoned staging directories.
+
+        The live version and the `keep` newest versions are always kept.
+        Returns the names of the removed versions.
+        """
+        if not self.versions_dir.exists():
+            return []
+        current = self.current_version()
+        cutoff = time.time() - lease_ttl
+        published = sorted(p.name for p in self.versions_dir.iterdir() if not p.name.startswith(STAGING_PREFIX))
+        protected = set(published[-keep:]) | {current}
+
+        removed = []
+        for path in self.versions_dir.iterdir():
+            name = path.name
+            if name.startswith(STAGING_PREFIX):
+                if path.stat().st_mtime < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            if name in protected or self._has_live_lease(name, lease_ttl):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            shutil.rmtree(self.leases_dir / name, ignore_errors=True)
+            removed.append(name)
+        return removed
+
+
+class HotSwapper:
+    """Keeps a loaded index and swaps in newly published versions without blocking requests.
+
+    The first `get` loads whatever is live. Later calls return the loaded
+    payload immediately and, at most every `check_interval` seconds, start a
+    background thread that loads a new version if CURRENT has moved. A timer
+    thread renews this reader's lease every `lease_interval` seconds, busy or
+    idle, so garbage collection never removes files it still has mapped.
+
+    Arguments:
+        versioned_index: The `VersionedIndex` to follow.
+        load_fn: Called with a version directory (or None when nothing has been
+            published yet) and returns the payload to serve.
+        retire_fn: Optionally called with a replaced payload once `retire_delay`
+            seconds have passed, letting in-flight requests finish with it first,
+            e.g. to stop the worker processes of a sharded index.
+        lease_interval: Seconds between lease renewals; keep it well under
+            the `lease_ttl` garbage collection runs with.
+    """
+
+    def __init__(
+        self, versioned_index, load_fn, check_interval=30.0, retire_fn=None, retire_delay=60.0, lease_interval=60.0
+    ):
+        self.versioned_index = versioned_index
+        self.load_fn = load_fn
+        self.check_interval = check_interval
+        self.retire_fn = retire_fn
+        self.retire_delay = retire_delay
+        self.lease_interval = lease_interval
+        self._current = None
+        self._lock = threading.Lock()
+        self._checking = False
+        self._last_check = 0.0
+        self._lease_thread = None
+
+    @property
+    def loaded(self):
+        return self._current is not None
+
+    def _load(self, version):
+        if not version:
+            return self.load_fn(None)
+        # lease first so garbage collection can't remove the files while they load
+        self.versioned_index.touch_lease(version)
+        if not self.versioned_index.verify(version, hash_files=False):
+            raise RuntimeError(f"index version {version} does not match its manifest")
+        return self.load_fn(self.versioned_index.version_dir(version))
+
+    def _renew_leases(self):
+        while True:
+            time.sleep(self.lease_interval)
+            version = self._current[0] if self._current else None
+            if version:
+                try:
+                    self.versioned_index.touch_lease(version)
+                except OSError as e:
+                    print(f"could not renew lease on index version {version}: {e!r}")
+
+    def get(self):
+        """Returns (version, payload) for the version currently being served."""
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    version = self.versioned_index.current_version()
+                    self._current = (version, self._load(version))
+                    self._last_check = time.monotonic()
+                    self._lease_thread = threading.Thread(target=self._renew_leases, name="index-lease", daemon=True)
+                    self._lease_thread.start()
+            return self._current
+
+        with self._lock:
+            due = not self._checking and time.monotonic() - self._last_check >= self.check_interval
+            if due:
+                self._checking = True
+                self._last_check = time.monotonic()
+        if due:
+            threading.Thread(target=self._check, name="index-hot-swap", daemon=True).start()
+        return self._current
+
+    def _retire(self, version, payload):
+        if self.retire_fn is not None:
+            self.retire_fn(payload)
+        if version:
+            self.versioned_index.release_lease(version)
+
+    def _check(self):
+        try:
+            old_version, old_payload = self._current
+            latest = self.versioned_index.current_version()
+            if latest and latest != old_version:
+                # a single assignment, so requests see either the old or the new pair
+                self._current = (latest, self._load(latest))
+                INDEX_SWAPS.inc(outcome="swapped")
+                # in-flight requests may still read the old files, so its lease outlives the swap a little
+                retire = threading.Timer(self.retire_delay, self._retire, args=(old_version, old_payload))
+                retire.daemon = True
+                retire.start()
+        except Exception as e:
+            INDEX_SWAPS.inc(outcome="failed")
+            print(f"hot swap of index failed: {e!r}")
+        finally:
+            self._checking = False
@@ -0,0 +1,218 @@
+"""Single, shared path to the completions API: pooled connections, rate limits, retries and a prompt cache.
+
+Every container keeps one `LLMGateway`. Requests wait on token buckets sized
+to the account's requests/min and tokens/min limits instead of bursting into
+429s. The 429s and 5xxs that still happen are retried with backoff, and
+completions are cached on the exact model, parameters and prompt, so the
+same question over the same retrieved sources costs one call.
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from . import metrics
+
+API_BASE = os.environ.get("OPENAI_API_BASE", "https://api.openai.com/v1")
+REQUESTS_PER_MIN = float(os.environ.get("LLM_REQUESTS_PER_MIN", 3000))
+TOKENS_PER_MIN = float(os.environ.get("LLM_TOKENS_PER_MIN", 250000))
+# on the vector volume so every container shares it; set to "" to disable the cache
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", str(Path(os.environ.get("VECTOR_DIR", "/vectors")) / "llm-cache.sqlite"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+RATE_LIMIT_WAIT = metrics.Histogram(
+    "nassbot_llm_rate_limit_wait_seconds", "Time requests waited on the LLM token buckets.", ("bucket",)
+)
+
+
+class LLMError(Exception):
+    """Raised when a completion fails for good, after any retries."""
+
+
+def estimate_tokens(text):
+    # about four characters per token for English; tiktoken would cost more than the error it saves here
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Allows `rate_per_min` units a minute, in bursts of up to `capacity` (by default one second's worth).
+
+    The API enforces its per-minute limits over shorter windows too, so a
+    full minute's burst would still draw 429s.
+    """
+
+    def __init__(self, rate_per_min, capacity=None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity or max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1.0):
+        """Blocks until `amount` units are available and takes them; returns the seconds waited."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class PromptCache:
+    """SQLite table of completions keyed by a hash of the model, parameters and prompt.
+
+    Lookups and writes that fail (e.g. a locked database on the shared volume)
+    count as misses, and `LLMGateway` runs without a cache it cannot open; the
+    cache never fails a request.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, model TEXT, text TEXT, created REAL)"
+        )
+
+    def _connection(self):
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        return self._local.connection
+
+    @staticmethod
+    def key(model, prompt, params):
+        payload = json.dumps({"model": model, "prompt": prompt, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        try:
+            row = self._connection().execute("SELECT text FROM completions WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def put(self, key, model, text):
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)", (key, model, text, time.time())
+            )
+        except sqlite3.Error as e:
+            print(f"could not cache completion: {e!r}")
+
+
+class LLMGateway:
+    """Rate-limited, retrying, caching client for the completions endpoint.
+
+    Arguments:
+        model: Completion model name.
+        api_base: Base URL of the API, e.g. a local `benchmarks.fake_llm`.
+        requests_per_min, tokens_per_min: The limits the token buckets enforce.
+        cache_path: SQLite file for the prompt cache, or None to disable it.
+        max_retries: Retries of a 429 or 5xx, with jittered exponential backoff
+            that honours any Retry-After header.
+        pool_size: Pooled HTTP connections kept to the API.
+    """
+
+    def __init__(
+        self, model="text-davinci-003", api_base=API_BASE, api_key=None, requests_per_min=REQUESTS_PER_MIN,
+        tokens_per_min=TOKENS_PER_MIN, cache_path=CACHE_PATH, max_retries=6, backoff=1.0, max_backoff=30.0,
+        timeout=60.0, pool_size=32,
+    ):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.model = model
+        self.url = api_base.rstrip("/") + "/completions"
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY", "")
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        self.cache = None
+        if cache_path:
+            try:
+                self.cache = PromptCache(cache_path)
+            except (sqlite3.Error, OSError) as e:
+                # a corrupt or unreachable cache file only costs the cache, not every completion
+                print(f"prompt cache disabled, could not open {cache_path}: {e!r}")
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def complete(self, prompt, max_tokens=256, temperature=0.0, stop=None):
+        """Returns the completion text for a prompt, from the cache when the exact request was seen before."""
+        params = {"max_tokens": max_tokens, "temperature": temperature, "stop": stop}
+        # only deterministic completions are worth replaying
+        cacheable = self.cache is not None and temperature == 0
+        key = PromptCache.key(self.model, prompt, params)
+        if cacheable:
+            cached = self.cache.get(key)
+            metrics.cache_lookup("llm_prompt", cached is not None)
+            if cached is not None:
+                metrics.LLM_REQUESTS.inc(outcome="cached")
+                return cached
+
+        body = {"model": self.model, "prompt": prompt, **{k: v for k, v in params.items() if v is not None}}
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        for attempt in range(self.max_retries + 1):
+            RATE_LIMIT_WAIT.observe(self.requests.acquire(), bucket="requests")
+            RATE_LIMIT_WAIT.observe(self.tokens.acquire(estimate_tokens(prompt) + max_tokens), bucket="tokens")
+            try:
+                response = self.session.post(self.url, json=body, headers=headers, timeout=self.timeout)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    metrics.LLM_REQUESTS.inc(outcome="error")
+                    raise LLMError(f"completion request failed: {e!r}") from e
+                metrics.LLM_REQUESTS.inc(outcome="retried")
+                time.sleep(self._delay(attempt))
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                metrics.LLM_REQUESTS.inc(outcome="rate_limited" if response.status_code == 429 else "retried")
+                time.sleep(self._delay(attempt, response))
+                continue
+            if response.status_code != 200:
+                metrics.LLM_REQUESTS.inc(outcome="error")
+                raise LLMError(f"completion failed with {response.status_code}: {response.text[:200]}")
+            text = response.json()["choices"][0]["text"]
+            metrics.LLM_REQUESTS.inc(outcome="ok")
+            if cacheable:
+                self.cache.put(key, self.model, text)
+            return text
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """The container's shared gateway, created on first use."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+    return _gateway
@@ -0,0 +1,209 @@
+"""In-process counters, histograms and per-stage timing spans for the Q&A backend.
+
+Everything here is pure Python so it can be imported from any container
+(or a local harness) without pulling in the model or cloud dependencies.
+"""
+import contextlib
+import contextvars
+import json
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+REGISTRY = []
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _lock:
+            REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labelnames)
+
+    def _fmt_labels(self, key, extra=None):
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{self._fmt_labels(key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts, total, n = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            counts = [c + (value <= b) for c, b in zip(counts, self.buckets)]
+            self._values[key] = (counts, total + value, n + 1)
+
+    def count(self, **labels):
+        return self._values.get(self._key(labels), (None, 0.0, 0))[2]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with _lock:
+            items = sorted(self._values.items())
+        for key, (counts, total, n) in items:
+            for bucket, count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{self._fmt_labels(key, ('le', bucket))} {count}")
+            lines.append(f"{self.name}_bucket{self._fmt_labels(key, ('le', '+Inf'))} {n}")
+            lines.append(f"{self.name}_sum{self._fmt_labels(key)} {total}")
+            lines.append(f"{self.name}_count{self._fmt_labels(key)} {n}")
+        return lines
+
+
+def render():
+    """Renders every registered metric in the Prometheus text exposition format."""
+    with _lock:
+        metrics = list(REGISTRY)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "nassbot_stage_seconds", "Wall-clock time spent in each request stage.", ("stage",)
+)
+STAGE_ERRORS = Counter(
+    "nassbot_stage_errors_total", "Stages that exited with an exception.", ("stage",)
+)
+STAGE_IN_FLIGHT = Gauge(
+    "nassbot_stage_in_flight", "Requests currently inside each stage.", ("stage",)
+)
+CACHE_REQUESTS = Counter(
+    "nassbot_cache_requests_total", "Cache lookups by cache and result.", ("cache", "result")
+)
+RETRIEVED_SOURCES = Histogram(
+    "nassbot_retrieved_sources", "Number of sources returned by retrieval.", buckets=(0, 1, 2, 4, 8, 16)
+)
+FAST_PATH_REQUESTS = Counter(
+    "nassbot_fast_path_requests_total", "Questions seen by the metadata router, by result.", ("result",)
+)
+LLM_REQUESTS = Counter(
+    "nassbot_llm_requests_total", "Completions requested from the LLM by outcome.", ("outcome",)
+)
+WARMUP_REPLAYS = Counter(
+    "nassbot_warmup_replays_total", "Logged questions replayed by the warm-up, by how they were answered.", ("result",)
+)
+
+_current_trace = contextvars.ContextVar("nassbot_trace", default=None)
+
+
+class Trace:
+    """Collects the spans of a single request so they can be logged together."""
+
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+        self.spans = []
+        self.caches = {}
+        self.start = time.perf_counter()
+
+    def add(self, stage, seconds, error=None):
+        self.spans.append({"stage": stage, "ms": round(seconds * 1000, 2), "error": error})
+
+    def summary(self):
+        return {
+            "event": "trace",
+            "request_id": None if self.request_id is None else str(self.request_id),
+            "total_ms": round((time.perf_counter() - self.start) * 1000, 2),
+            "spans": self.spans,
+            "caches": self.caches,
+        }
+
+
+@contextlib.contextmanager
+def trace(request_id=None):
+    """Groups the spans opened inside the block and logs them as one structured line."""
+    current = Trace(request_id)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        print(json.dumps(current.summary()))
+
+
+def cache_lookup(cache, hit):
+    """Counts a cache lookup, and notes its result on the active trace."""
+    result = "hit" if hit else "miss"
+    CACHE_REQUESTS.inc(cache=cache, result=result)
+    current = _current_trace.get()
+    if current is not None:
+        current.caches[cache] = result
+
+
+@contextlib.contextmanager
+def span(stage):
+    """Times a request stage, recording it in the stage histogram and the active trace."""
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        current = _current_trace.get()
+        if current is not None:
+            current.add(stage, elapsed, error)
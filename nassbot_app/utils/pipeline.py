@@ -0,0 +1,329 @@
+"""Content-addressed, checkpointed DAG runner for the document pipeline.
+
+Each stage declares the stages it reads. A stage's work is memoized under a
+key made of its fingerprint (name, version, source code and config) and the
+content hashes of its inputs, so a rerun skips every stage, and for
+per-document stages every document, whose inputs and code are unchanged.
+Outputs are stored as soon as they are computed, so a failed run resumes
+from the last good artifacts. Stages whose inputs are ready run in parallel.
+
+    pipeline = Pipeline(ArtifactStore("/vectors/artifacts"))
+
+    @pipeline.stage(always=True, keyed=True)
+    def scrape():
+        return {document_id(doc): doc for doc in collection.find({})}
+
+    @pipeline.stage(inputs=("scrape",), per_document=True, workers=16)
+    def download(batch):
+        return {doc_id: fetch(inputs["scrape"]) for doc_id, inputs in batch.items()}
+
+    pipeline.run()
+
+On disk, under the store's root:
+
+    objects/ab/abcd...         pickled outputs, named by the sha256 of their bytes
+    memo/{stage}/cd/cdef...    JSON pointing a stage's input key at its output object(s)
+    runs/{started}.json        what each run computed, skipped and failed
+"""
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import metrics
+
+PIPELINE_DOCUMENTS = metrics.Counter(
+    "nassbot_pipeline_documents_total", "Documents seen by per-document pipeline stages, by result.", ("stage", "result")
+)
+
+
+class PipelineError(Exception):
+    """Raised when stages of a run fail. What they computed before failing is kept for the next run."""
+
+
+def _digest(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ArtifactStore:
+    """Pickled objects named by their content hash, and memo entries pointing input keys at them.
+
+    Every write goes to a temporary file that is renamed into place, so an
+    interrupted run never leaves a truncated artifact behind.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _object_path(self, digest):
+        return self.root / "objects" / digest[:2] / digest
+
+    def _memo_path(self, stage, key):
+        return self.root / "memo" / stage / key[:2] / key
+
+    def put(self, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        digest = _digest(data)
+        path = self._object_path(digest)
+        if not path.exists():
+            _write_atomic(path, data)
+        return digest
+
+    def get(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return pickle.load(f)
+
+    def memo(self, stage, key):
+        path = self._memo_path(stage, key)
+        if not path.exists():
+            return None
+        memo = json.loads(path.read_text())
+        # an object removed by hand invalidates the entries pointing at it
+        digests = memo["keyed"].values() if "keyed" in memo else [memo["object"]]
+        return memo if all(self._object_path(digest).exists() for digest in digests) else None
+
+    def remember(self, stage, key, memo):
+        _write_atomic(self._memo_path(stage, key), json.dumps(memo).encode())
+
+    def record_run(self, report):
+        _write_atomic(self.root / "runs" / f"{report['started']}.json", json.dumps(report, indent=2).encode())
+
+
+class Stage:
+    """A step of the pipeline; see `Pipeline.stage` for the arguments."""
+
+    def __init__(self, fn, name, inputs, version, config, per_document, keyed, always, batch_size, workers):
+        self.fn = fn
+        self.name = name
+        self.inputs = tuple(inputs)
+        self.per_document = per_document
+        self.keyed = keyed or per_document
+        self.always = always
+        self.batch_size = batch_size
+        self.workers = workers
+        try:
+            source = inspect.getsource(fn)
+        except (OSError, TypeError):
+            source = fn.__qualname__
+        self.fingerprint = _digest(name, version, source, json.dumps(config or {}, sort_keys=True, default=str))
+
+
+class _Output:
+    """A finished stage's output: one object, or one object per document id."""
+
+    def __init__(self, store, digest=None, keyed=None):
+        self.store = store
+        self.digest = digest
+        self.keyed = keyed
+
+    def content_key(self):
+        if self.keyed is None:
+            return self.digest
+        return _digest(json.dumps(self.keyed, sort_keys=True))
+
+    def load(self):
+        if self.keyed is None:
+            return self.store.get(self.digest)
+        return {doc_id: self.store.get(digest) for doc_id, digest in self.keyed.items()}
+
+
+class Pipeline:
+    """A DAG of stages over an `ArtifactStore`.
+
+    Arguments:
+        store: Where outputs and memo entries are kept between runs.
+        max_parallel_stages: Stages run at once when their inputs are ready.
+    """
+
+    def __init__(self, store, max_parallel_stages=4):
+        self.store = store
+        self.max_parallel_stages = max_parallel_stages
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def stage(
+        self, inputs=(), version="1", config=None, per_document=False, keyed=False, always=False, batch_size=1,
+        workers=1, name=None,
+    ):
+        """Registers the decorated function as a stage.
+
+        Arguments:
+            inputs: Names of the stages whose outputs it reads.
+            version: Bump to invalidate artifacts when behaviour changes outside the function's source.
+            config: JSON-serialisable settings the output depends on, e.g. chunk sizes.
+            per_document: The function gets `{doc_id: {input: value}}` for a batch of documents
+                and returns `{doc_id: output}`; only documents whose inputs changed are passed in.
+                Every input must be keyed by document id. Otherwise it gets each input as a
+                keyword argument and returns one output.
+            keyed: The output is a dict by document id, stored per document so that
+                per-document stages downstream can skip unchanged documents.
+            always: Run on every run instead of memoizing, for stages that read outside
+                sources. Downstream stages still skip when the output did not change.
+            batch_size, workers: Documents per call and calls run at once, for per-document stages.
+        """
+
+        def register(fn):
+            stage_name = name or fn.__name__
+            self.stages[stage_name] = Stage(
+                fn, stage_name, inputs, version, config, per_document, keyed, always, batch_size, workers
+            )
+            return fn
+
+        return register
+
+    def _order(self, targets):
+        needed, pending = set(), list(targets or self.stages)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise ValueError(f"unknown pipeline stage {name!r}")
+            if name not in needed:
+                needed.add(name)
+                pending.extend(self.stages[name].inputs)
+        return needed
+
+    def _run_whole(self, stage, inputs):
+        key = _digest(stage.fingerprint, *(inputs[name].content_key() for name in stage.inputs))
+        memo = None if stage.always else self.store.memo(stage.name, key)
+        if memo is not None:
+            return _Output(self.store, memo.get("object"), memo.get("keyed")), {"skipped": 1}
+        value = stage.fn(**{name: inputs[name].load() for name in stage.inputs})
+        if stage.keyed:
+            memo = {"keyed": {str(doc_id): self.store.put(item) for doc_id, item in value.items()}}
+        else:
+            memo = {"object": self.store.put(value)}
+        self.store.remember(stage.name, key, memo)
+        return _Output(self.store, memo.get("object"), memo.get("keyed")), {"computed": 1}
+
+    def _run_per_document(self, stage, inputs):
+        for name in stage.inputs:
+            if inputs[name].keyed is None:
+                raise ValueError(f"stage {stage.name!r} is per document but its input {name!r} is not keyed")
+        doc_ids = [
+            doc_id for doc_id in inputs[stage.inputs[0]].keyed
+            if all(doc_id in inputs[name].keyed for name in stage.inputs[1:])
+        ]
+        outputs, pending = {}, {}
+        for doc_id in doc_ids:
+            key = _digest(stage.fingerprint, *(inputs[name].keyed[doc_id] for name in stage.inputs))
+            memo = self.store.memo(stage.name, key)
+            if memo is not None:
+                outputs[doc_id] = memo["object"]
+            else:
+                pending[doc_id] = key
+        PIPELINE_DOCUMENTS.inc(len(outputs), stage=stage.name, result="skipped")
+
+        failed = {}
+
+        def run_batch(batch_ids):
+            batch = {
+                doc_id: {name: self.store.get(inputs[name].keyed[doc_id]) for name in stage.inputs}
+                for doc_id in batch_ids
+            }
+            try:
+                results = stage.fn(batch)
+            except Exception as e:
+                results, error = {}, repr(e)
+            else:
+                error = "no output returned"
+            for doc_id in batch_ids:
+                if doc_id not in results:
+                    with self._lock:
+                        failed[doc_id] = error
+                    continue
+                digest = self.store.put(results[doc_id])
+                self.store.remember(stage.name, pending[doc_id], {"object": digest})
+                with self._lock:
+                    outputs[doc_id] = digest
+
+        pending_ids = list(pending)
+        batches = [pending_ids[i:i + stage.batch_size] for i in range(0, len(pending_ids), stage.batch_size)]
+        with ThreadPoolExecutor(stage.workers) as pool:
+            list(pool.map(run_batch, batches))
+        PIPELINE_DOCUMENTS.inc(len(pending) - len(failed), stage=stage.name, result="computed")
+        PIPELINE_DOCUMENTS.inc(len(failed), stage=stage.name, result="failed")
+        counts = {"skipped": len(doc_ids) - len(pending), "computed": len(pending) - len(failed)}
+        if failed:
+            sample = dict(list(failed.items())[:5])
+            raise PipelineError(f"stage {stage.name!r} failed on {len(failed)} documents, e.g. {sample}", counts)
+        return _Output(self.store, keyed={doc_id: outputs[doc_id] for doc_id in doc_ids}), counts
+
+    def _run_stage(self, stage, inputs):
+        start = time.perf_counter()
+        with metrics.span(f"pipeline_{stage.name}"):
+            if stage.per_document:
+                output, counts = self._run_per_document(stage, inputs)
+            else:
+                output, counts = self._run_whole(stage, inputs)
+        return output, {**counts, "seconds": round(time.perf_counter() - start, 3)}
+
+    def run(self, targets=None):
+        """Runs the stages `targets` need (by default all), skipping up-to-date work.
+
+        Returns `{stage: {"computed": n, "skipped": n, "seconds": s}}`, with
+        per-document stages counting documents. If any stage fails, raises
+        `PipelineError` with the run's report as its second argument once
+        every stage that can still run has run.
+        """
+        needed = self._order(targets)
+        report = {"started": datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f"), "stages": {}, "failed": {}}
+        outputs, running = {}, {}
+        blocked = set()
+
+        def ready(name):
+            return name not in outputs and name not in running.values() and name not in blocked and all(
+                dependency in outputs for dependency in self.stages[name].inputs
+            )
+
+        with ThreadPoolExecutor(self.max_parallel_stages) as pool:
+            while True:
+                for name in sorted(needed):
+                    if ready(name):
+                        stage = self.stages[name]
+                        running[pool.submit(self._run_stage, stage, {i: outputs[i] for i in stage.inputs})] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        outputs[name], report["stages"][name] = future.result()
+                    except Exception as e:
+                        counts = e.args[1] if isinstance(e, PipelineError) and len(e.args) > 1 else {}
+                        report["stages"][name] = counts
+                        report["failed"][name] = str(e.args[0] if isinstance(e, PipelineError) else repr(e))
+                        blocked |= self._dependents(name, needed)
+        report["not_run"] = sorted(needed - set(outputs) - set(report["failed"]))
+        self.store.record_run(report)
+        if report["failed"]:
+            raise PipelineError(f"pipeline stages failed: {report['failed']}; rerun to resume", report)
+        return report["stages"]
+
+    def _dependents(self, name, needed):
+        dependents, changed = {name}, True
+        while changed:
+            changed = False
+            for other in needed - dependents:
+                if dependents & set(self.stages[other].inputs):
+                    dependents.add(other)
+                    changed = True
+        return dependents
@@ -0,0 +1,139 @@
+"""Sampling profiler for slow Q&A requests, cheap enough to leave on in production.
+
+While a profiled request runs, a daemon thread samples the request thread's
+stack from `sys._current_frames()` every `interval` seconds. Requests that
+finish above the latency threshold have their samples written to the shared
+volume as collapsed stacks, one `root;...;leaf count` line per distinct stack,
+ready for `flamegraph.pl` or speedscope:
+
+    /vectors/profiles/20230601T120000123456-<request_id>-31250ms.collapsed
+
+Only the newest `PROFILE_KEEP` profiles are kept. Samples are wall-clock, so
+time spent waiting on OpenAI or disk shows up as much as time spent computing.
+"""
+import collections
+import contextlib
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from . import metrics
+
+# profile every request, keeping those slower than the threshold; a request can also ask for a profile itself
+ENABLED = os.environ.get("PROFILE_REQUESTS", "").lower() in ("1", "true", "yes")
+THRESHOLD_S = float(os.environ.get("PROFILE_THRESHOLD_S", 5.0))
+INTERVAL_S = float(os.environ.get("PROFILE_INTERVAL_S", 0.01))
+PROFILE_DIR = Path(os.environ.get("PROFILE_DIR", Path(os.environ.get("VECTOR_DIR", "/vectors")) / "profiles"))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 500))
+# a stuck request should not grow its profile without bound
+MAX_SAMPLES = 100_000
+
+PROFILES_WRITTEN = metrics.Counter(
+    "nassbot_profiles_written_total", "Request profiles written, by why they were kept.", ("reason",)
+)
+
+
+def _frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class SamplingProfiler:
+    """Samples one thread's stack on a background thread and counts the distinct stacks."""
+
+    def __init__(self, thread_id=None, interval=INTERVAL_S):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval) and self.samples < MAX_SAMPLES:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _prune(profile_dir, keep):
+    # names start with a UTC timestamp, so they sort oldest first
+    profiles = sorted(profile_dir.glob("*.collapsed"))
+    for path in profiles[:max(0, len(profiles) - keep)]:
+        path.unlink(missing_ok=True)
+
+
+def write_profile(profiler, request_id, seconds, profile_dir=PROFILE_DIR, keep=PROFILE_KEEP):
+    """Writes a profile's collapsed stacks to `profile_dir` and prunes it to the newest `keep`."""
+    profile_dir = Path(profile_dir)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    tag = re.sub(r"[^\w.-]", "_", str(request_id))[:64] if request_id is not None else "no-id"
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    path = profile_dir / f"{stamp}-{tag}-{round(seconds * 1000)}ms.collapsed"
+    tmp = path.with_name(f".{path.name}")
+    tmp.write_text(profiler.collapsed())
+    os.replace(tmp, path)
+    _prune(profile_dir, keep)
+    return path
+
+
+class RequestProfile:
+    """What `profile_request` yields: the path of the written profile, once one is kept."""
+
+    def __init__(self):
+        self.path = None
+
+
+@contextlib.contextmanager
+def profile_request(request_id=None, force=False, enabled=None, threshold_s=None, profile_dir=None, keep=None):
+    """Profiles the block if profiling is on, keeping the profile if the block was slow.
+
+    Arguments:
+        request_id: Tags the profile's file name.
+        force: Profile and keep the result whatever the settings and latency,
+            for a request that asked for its own profile.
+        enabled, threshold_s, profile_dir, keep: Override $PROFILE_REQUESTS,
+            $PROFILE_THRESHOLD_S, $PROFILE_DIR and $PROFILE_KEEP.
+
+    Writing the profile never fails the request; errors are printed.
+    """
+    result = RequestProfile()
+    if not (force or (ENABLED if enabled is None else enabled)):
+        yield result
+        return
+    threshold_s = 0.0 if force else THRESHOLD_S if threshold_s is None else threshold_s
+    start = time.perf_counter()
+    profiler = SamplingProfiler().start()
+    try:
+        yield result
+    finally:
+        profiler.stop()
+        seconds = time.perf_counter() - start
+        if seconds >= threshold_s:
+            try:
+                result.path = write_profile(
+                    profiler, request_id, seconds, profile_dir or PROFILE_DIR, PROFILE_KEEP if keep is None else keep
+                )
+                PROFILES_WRITTEN.inc(reason="requested" if force else "slow")
+            except OSError as e:
+                print(f"could not write profile: {e!r}")
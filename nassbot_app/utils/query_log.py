@@ -0,0 +1,113 @@
+"""Anonymized log of the questions the backend answers, used to warm new containers.
+
+Questions are stored with mentions, emails and phone numbers redacted and
+the time they were asked, and nothing that identifies who asked them.
+Redacted questions are counted but never replayed: they would not match the
+prompt a later user sends, so they cannot warm a cache.
+
+Recording only enqueues the question; a `BatchExporter` writes them to the
+shared volume in batches, off the request path.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from .exporter import BatchExporter
+
+# on the vector volume so every container and deploy shares it; set to "" to disable logging
+LOG_PATH = os.environ.get("QUERY_LOG_PATH", str(Path(os.environ.get("VECTOR_DIR", "/vectors")) / "query-log.sqlite"))
+
+_REDACTIONS = (
+    (re.compile(r"<(?:@[!&]?|#)\d+>"), "<mention>"),
+    (re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+"), "<email>"),
+    # ten or more digits, so dates and bill numbers survive
+    (re.compile(r"\+?\d(?:[\s().-]?\d){9,}"), "<number>"),
+)
+
+
+def anonymize(question):
+    """Collapses whitespace and redacts mentions, emails and phone-like numbers."""
+    question = " ".join(question.split())
+    for pattern, replacement in _REDACTIONS:
+        question = pattern.sub(replacement, question)
+    return question
+
+
+class QueryLog:
+    """SQLite table of anonymized questions and the time they were asked.
+
+    Batches that fail to write (e.g. a locked database on the shared volume)
+    are printed and dropped; logging never fails a request.
+    """
+
+    def __init__(self, path=LOG_PATH, flush_interval=5.0, max_queue=1000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("CREATE TABLE IF NOT EXISTS queries (question TEXT, redacted INTEGER, asked REAL)")
+        # logs written before request ids were dropped kept their hash salt here
+        connection.execute("DROP TABLE IF EXISTS settings")
+        self.exporter = BatchExporter(
+            "query_log", self._write, flush_interval=flush_interval, max_queue=max_queue
+        )
+
+    def _connection(self):
+        if getattr(self._local, "connection", None) is None:
+            self._local.connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        return self._local.connection
+
+    def _write(self, rows):
+        connection = self._connection()
+        connection.execute("BEGIN")
+        try:
+            connection.executemany("INSERT INTO queries (question, redacted, asked) VALUES (?, ?, ?)", rows)
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def record(self, question):
+        anonymized = anonymize(question)
+        redacted = anonymized != " ".join(question.split())
+        self.exporter.submit((anonymized, int(redacted), time.time()))
+
+    def close(self):
+        """Writes the questions still queued."""
+        self.exporter.close()
+
+    def top_questions(self, n=20, since_days=30):
+        """The `n` most frequently asked replayable questions of the last `since_days` days, most frequent first."""
+        try:
+            rows = self._connection().execute(
+                "SELECT question, COUNT(*) AS times FROM queries WHERE redacted = 0 AND asked >= ? "
+                "GROUP BY question ORDER BY times DESC, MAX(asked) DESC LIMIT ?",
+                (time.time() - since_days * 86400, n),
+            ).fetchall()
+        except sqlite3.Error as e:
+            print(f"could not read query log: {e!r}")
+            return []
+        return [question for question, _ in rows]
+
+
+_query_log = None
+_query_log_failed = False
+_query_log_lock = threading.Lock()
+
+
+def get_query_log():
+    """The container's shared query log, or None when logging is disabled or the log cannot be opened."""
+    global _query_log, _query_log_failed
+    if not LOG_PATH:
+        return None
+    with _query_log_lock:
+        if _query_log is None and not _query_log_failed:
+            try:
+                _query_log = QueryLog()
+            except (sqlite3.Error, OSError) as e:
+                _query_log_failed = True
+                print(f"query logging disabled, could not open {LOG_PATH}: {e!r}")
+    return _query_log
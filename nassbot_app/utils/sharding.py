@@ -0,0 +1,198 @@
+"""FAISS index sharded by document hash, searched scatter-gather across worker processes.
+
+A sharded index is a directory holding `{index_name}.shards.json` and one
+ordinary LangChain FAISS index per shard, `{index_name}-shard000.faiss/.pkl`
+and so on. Chunks of one document always land in the same shard, so any
+shard can be rebuilt on its own when its documents change.
+"""
+import hashlib
+import heapq
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+from langchain.embeddings.base import Embeddings
+
+from . import metrics
+from .chunking import parent_document_id
+
+SHARD_SECONDS = metrics.Histogram(
+    "nassbot_shard_search_seconds", "Time for one shard to answer a scattered query.", ("shard",)
+)
+
+
+def shards_manifest_path(vector_dir, index_name):
+    return Path(vector_dir) / f"{index_name}.shards.json"
+
+
+def shard_name(index_name, shard):
+    return f"{index_name}-shard{shard:03d}"
+
+
+def shard_of(doc_id, n_shards):
+    """Stable shard assignment for a document id, identical across processes and runs."""
+    digest = hashlib.blake2b(str(doc_id).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") % n_shards
+
+
+def partition(texts, embeddings, ids, metadatas, n_shards):
+    """Splits parallel chunk lists into per-shard lists, keyed by the document each chunk id belongs to."""
+    shards = [([], [], [], []) for _ in range(n_shards)]
+    for text, embedding, chunk_id, metadata in zip(texts, embeddings, ids, metadatas):
+        shard = shards[shard_of(parent_document_id(chunk_id), n_shards)]
+        shard[0].append(text)
+        shard[1].append(embedding)
+        shard[2].append(chunk_id)
+        shard[3].append(metadata)
+    return shards
+
+
+def _replace_text(path, text):
+    # staged files may be hard links into a published version, so never rewrite one in place
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Embedding engine for shards, which are built from stored vectors and searched with embedded queries.
+
+    Shard workers never load the embedding model; the caller embeds each
+    query once before scattering it.
+    """
+
+    def embed_documents(self, texts):
+        raise RuntimeError("shards are built from precomputed embeddings; pass them to build_shard")
+
+    def embed_query(self, text):
+        raise RuntimeError("shards are searched by vector; embed the query before scattering it")
+
+
+def build_shard(vector_dir, index_name, shard, texts, embeddings, ids, metadatas):
+    """Builds and saves one shard, returning its chunk count."""
+    from langchain.vectorstores import FAISS
+
+    if texts:
+        index = FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, embeddings)), embedding=PrecomputedEmbeddings(), metadatas=metadatas, ids=ids
+        )
+        index.save_local(folder_path=str(vector_dir), index_name=shard_name(index_name, shard))
+    return len(texts)
+
+
+def _write_manifest(vector_dir, index_name, n_shards, chunk_counts):
+    manifest = {
+        "n_shards": n_shards,
+        "partition": "blake2b(doc_id) % n_shards",
+        "shards": [
+            {"name": shard_name(index_name, shard), "chunks": chunks} for shard, chunks in enumerate(chunk_counts)
+        ],
+    }
+    _replace_text(shards_manifest_path(vector_dir, index_name), json.dumps(manifest, indent=2))
+
+
+def build_sharded_index(vector_dir, index_name, texts, embeddings, ids, metadatas, n_shards, workers=None):
+    """Partitions chunks by document and builds every shard in parallel.
+
+    Building is FAISS adds and pickling from vectors already in memory, so
+    threads are enough and avoid re-importing the app in fresh processes.
+    """
+    shards = partition(texts, embeddings, ids, metadatas, n_shards)
+    with ThreadPoolExecutor(workers or n_shards) as pool:
+        chunk_counts = list(
+            pool.map(lambda shard: build_shard(str(vector_dir), index_name, shard, *shards[shard]), range(n_shards))
+        )
+    _write_manifest(vector_dir, index_name, n_shards, chunk_counts)
+    return chunk_counts
+
+
+def rebuild_shard(vector_dir, index_name, shard, texts, embeddings, ids, metadatas):
+    """Rebuilds a single shard from chunks of the documents that hash to it; other shards are untouched.
+
+    Chunks belonging to other shards are ignored, so callers may pass the full corpus.
+    """
+    manifest = json.loads(shards_manifest_path(vector_dir, index_name).read_text())
+    n_shards = manifest["n_shards"]
+    lists = partition(texts, embeddings, ids, metadatas, n_shards)[shard]
+    for suffix in (".faiss", ".pkl"):
+        Path(vector_dir, shard_name(index_name, shard) + suffix).unlink(missing_ok=True)
+    chunks = build_shard(vector_dir, index_name, shard, *lists)
+    manifest["shards"][shard]["chunks"] = chunks
+    _replace_text(shards_manifest_path(vector_dir, index_name), json.dumps(manifest, indent=2))
+    return chunks
+
+
+_shard_index = None
+
+
+def _load_shard(vector_dir, name):
+    global _shard_index
+    from langchain.vectorstores import FAISS
+
+    if Path(vector_dir, f"{name}.faiss").exists():
+        _shard_index = FAISS.load_local(vector_dir, PrecomputedEmbeddings(), name)
+
+
+def _shard_size():
+    return 0 if _shard_index is None else _shard_index.index.ntotal
+
+
+def _search_shard(embedding, k):
+    start = time.perf_counter()
+    if _shard_index is None:
+        return [], 0.0
+    hits = _shard_index.similarity_search_with_score_by_vector(embedding, k)
+    return [(doc, float(score)) for doc, score in hits], time.perf_counter() - start
+
+
+class ShardedIndex:
+    """Searches every shard concurrently and merges their top-k by distance.
+
+    Each shard is held by its own worker process (or `replicas` of them), so
+    shards are searched in parallel and no process needs the whole index in
+    memory. Offers the search methods of the LangChain FAISS wrapper that the
+    chain uses.
+    """
+
+    def __init__(self, vector_dir, index_name, embedding_engine, replicas=1):
+        self.embedding_engine = embedding_engine
+        manifest = json.loads(shards_manifest_path(vector_dir, index_name).read_text())
+        context = get_context("spawn")
+        self.workers = [
+            ProcessPoolExecutor(
+                max_workers=replicas, mp_context=context, initializer=_load_shard,
+                initargs=(str(vector_dir), shard["name"]),
+            )
+            for shard in manifest["shards"]
+        ]
+        # workers start lazily; ask each for its size so shards load now, in parallel, not on the first query
+        futures = [worker.submit(_shard_size) for worker in self.workers]
+        self.sizes = [future.result() for future in futures]
+
+    @property
+    def n_shards(self):
+        return len(self.workers)
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4):
+        embedding = list(map(float, embedding))
+        futures = [worker.submit(_search_shard, embedding, k) for worker in self.workers]
+        hits = []
+        for shard, future in enumerate(futures):
+            shard_hits, seconds = future.result()
+            hits.extend(shard_hits)
+            SHARD_SECONDS.observe(seconds, shard=shard)
+        return heapq.nsmallest(k, hits, key=lambda hit: hit[1])
+
+    def similarity_search_by_vector(self, embedding, k=4):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search(self, query, k=4):
+        return self.similarity_search_by_vector(self.embedding_engine.embed_query(query), k)
+
+    def close(self):
+        for worker in self.workers:
+            worker.shutdown(wait=True)
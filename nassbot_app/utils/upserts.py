@@ -0,0 +1,137 @@
+"""Concurrent, retrying and resumable bulk upserts of precomputed vectors into a Pinecone index.
+
+Works against anything with the `upsert(vectors=..., namespace=...)` method of
+`pinecone.Index`, including the in-process stand-in in `benchmarks.fake_pinecone`.
+"""
+import hashlib
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from . import metrics
+
+UPSERTED_VECTORS = metrics.Counter("nassbot_upserted_vectors_total", "Vectors written by bulk upserts.")
+UPSERT_BATCHES = metrics.Counter(
+    "nassbot_upsert_batches_total", "Bulk upsert batches by outcome.", ("outcome",)
+)
+
+
+def batch_key(ids, texts):
+    """Identifies a batch by its chunk ids and texts, so a checkpoint never skips a batch whose contents changed."""
+    digest = hashlib.blake2b(digest_size=12)
+    for chunk_id, text in zip(ids, texts):
+        digest.update(chunk_id.encode())
+        digest.update(b"\0")
+        digest.update(text.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Append-only record of the batches a bulk load has already written.
+
+    Ids are deterministic, so upserts are idempotent and replaying a batch is
+    harmless; the checkpoint only saves the time of sending it again.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.done = set()
+        self._lock = threading.Lock()
+        if self.path and self.path.exists():
+            self.done = {json.loads(line)["batch"] for line in self.path.read_text().splitlines() if line}
+
+    def add(self, key, size):
+        with self._lock:
+            self.done.add(key)
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"batch": key, "vectors": size}) + "\n")
+
+    def clear(self):
+        """Forgets every batch, e.g. once a load has completed and the next one should send everything."""
+        with self._lock:
+            self.done = set()
+            if self.path:
+                self.path.unlink(missing_ok=True)
+
+
+def _with_retries(fn, max_retries, backoff, max_backoff):
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except Exception:
+            if attempt == max_retries:
+                raise
+            UPSERT_BATCHES.inc(outcome="retried")
+            # full jitter keeps concurrent workers from retrying in lockstep
+            time.sleep(random.uniform(0, min(max_backoff, backoff * 2 ** attempt)))
+
+
+def bulk_upsert(
+    index, texts, embeddings, ids, metadatas, text_key="text", namespace=None, batch_size=100,
+    concurrency=8, max_retries=5, backoff=0.5, max_backoff=30.0, checkpoint=None,
+):
+    """Upserts precomputed vectors in batches, `concurrency` batches at a time.
+
+    Arguments:
+        index: A `pinecone.Index`, or a stand-in with the same `upsert` method.
+        texts, embeddings, ids, metadatas: Parallel lists; each text is stored in
+            its metadata under `text_key`, where LangChain's `Pinecone` reads it.
+        batch_size: Vectors per upsert request.
+        concurrency: Upsert requests in flight at once.
+        max_retries: Attempts per batch after the first, with jittered exponential backoff.
+        checkpoint: Path of a checkpoint file; batches recorded there are skipped,
+            so a failed load can be rerun and resumes where it stopped. It is
+            deleted once every batch has been written, so a later load (say, to
+            a recreated index) sends everything again.
+
+    Returns:
+        A dict with the number of vectors upserted, skipped and failed.
+    """
+    if len(set(ids)) != len(ids):
+        raise ValueError("ids must be unique so that upserts are idempotent")
+    checkpoint = checkpoint if isinstance(checkpoint, Checkpoint) else Checkpoint(checkpoint)
+    starts = range(0, len(ids), batch_size)
+
+    def upsert(start):
+        batch_ids = ids[start:start + batch_size]
+        key = batch_key(batch_ids, texts[start:start + batch_size])
+        if key in checkpoint.done:
+            UPSERT_BATCHES.inc(outcome="skipped")
+            return "skipped", len(batch_ids)
+        vectors = [
+            (chunk_id, list(map(float, embedding)), {**metadata, text_key: text})
+            for chunk_id, embedding, metadata, text in zip(
+                batch_ids,
+                embeddings[start:start + batch_size],
+                metadatas[start:start + batch_size],
+                texts[start:start + batch_size],
+            )
+        ]
+        _with_retries(lambda: index.upsert(vectors=vectors, namespace=namespace), max_retries, backoff, max_backoff)
+        checkpoint.add(key, len(vectors))
+        UPSERT_BATCHES.inc(outcome="upserted")
+        UPSERTED_VECTORS.inc(len(vectors))
+        return "upserted", len(vectors)
+
+    counts = {"upserted": 0, "skipped": 0, "failed": 0}
+    errors = []
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = {pool.submit(upsert, start): start for start in starts}
+        for future in as_completed(futures):
+            try:
+                outcome, size = future.result()
+            except Exception as e:
+                UPSERT_BATCHES.inc(outcome="failed")
+                outcome, size = "failed", len(ids[futures[future]:futures[future] + batch_size])
+                errors.append(e)
+            counts[outcome] += size
+    if errors:
+        counts["error"] = repr(errors[0])
+    else:
+        checkpoint.clear()
+    return counts
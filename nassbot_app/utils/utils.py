@@ -9,8 +9,8 @@ import pdfplumber
 from io import BytesIO
 
 session = boto3.Session(
-    aws_access_key_id=os.environ['AWS_ACCESS_KEY_ID'],
-    aws_secret_access_key=os.environ['AWS_SECRET_ACCESS_KEY'],
+    aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
+    aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
 )
 
 BUCKET = "nass-bot"
@@ -27,11 +27,37 @@ def get_pdf_text(sub_dir, doc_id):
     s3 = session.resource('s3', config=config)
     obj = s3.Object(BUCKET, f"pdf_files/{sub_dir}/{doc_id}.pdf")
     fs = obj.get()['Body'].read()
-    with pdfplumber.open(BytesIO(fs)) as pdf:
+    return pdf_text(fs)
+
+
+def pdf_text(pdf_bytes):
+    """Extracts text from the bytes of a PDF file."""
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
         text = "\n".join([page.extract_text() for page in pdf.pages])
     return text
 
 
+def get_pdf_bytes(sub_dir, doc_id, url=None):
+    """Reads a PDF from S3, first fetching it from `url` into S3 if it is not there yet.
+
+    Returns None when the PDF is in neither place.
+    """
+    import requests
+
+    s3 = session.resource('s3', config=config)
+    obj = s3.Object(BUCKET, f"pdf_files/{sub_dir}/{doc_id}.pdf")
+    try:
+        return obj.get()['Body'].read()
+    except s3.meta.client.exceptions.NoSuchKey:
+        if not url:
+            return None
+    response = requests.get(url, timeout=60)
+    if response.status_code != 200:
+        return None
+    obj.put(Body=response.content)
+    return response.content
+
+
 def save_json_to_s3(json_object, bucket, key):
     pretty_log("Saving docs to s3")
     s3 = session.resource('s3', config=config)
@@ -71,15 +97,34 @@ def pretty_log(str):
     print(f"{START}🥞: {str}{END}")
 
 
-def log_event(query, sources, answer, request_id=None):
-    """Logs the event to Gantry."""
-    import os
+_gantry_exporter = None
 
+
+def _send_to_gantry(events):
     import gantry
 
-    gantry.init(api_key=os.environ["GANTRY_API_KEY"], environment="modal")
+    gantry.log_records(
+        application="ask-fsdl",
+        inputs=[event["inputs"] for event in events],
+        outputs=[event["outputs"] for event in events],
+        join_keys=[event["join_key"] for event in events],
+    )
+
+
+def get_gantry_exporter():
+    """Initializes Gantry once per container and returns its batching exporter."""
+    global _gantry_exporter
+    if _gantry_exporter is None:
+        import gantry
+        from .exporter import BatchExporter
 
-    application = "ask-fsdl"
+        gantry.init(api_key=os.environ["GANTRY_API_KEY"], environment="modal")
+        _gantry_exporter = BatchExporter("gantry", _send_to_gantry)
+    return _gantry_exporter
+
+
+def log_event(query, sources, answer, request_id=None):
+    """Queues the event for export to Gantry and returns its join key."""
     join_key = str(request_id) if request_id else None
 
     inputs = {"question": query}
@@ -89,11 +134,9 @@ def log_event(query, sources, answer, request_id=None):
     )
     outputs = {"answer_text": answer}
 
-    record_key = gantry.log_record(
-        application=application, inputs=inputs, outputs=outputs, join_key=join_key
-    )
+    get_gantry_exporter().submit({"inputs": inputs, "outputs": outputs, "join_key": join_key})
 
-    return record_key
+    return join_key
 
 
 # Terminal codes for pretty-printing.
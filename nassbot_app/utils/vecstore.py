@@ -1,4 +1,6 @@
+import contextlib
 import os
+import threading
 from pathlib import Path
 import pinecone
 from langchain.vectorstores import Pinecone
@@ -8,14 +10,29 @@ from langchain.embeddings import HuggingFaceEmbeddings
 from .utils import pretty_log
 
 INDEX_NAME = os.environ.get("INDEX_NAME")
-VECTOR_DIR = Path("/vectors")
+VECTOR_DIR = Path(os.environ.get("VECTOR_DIR", "/vectors"))
+# name of a `utils.embedders` engine to use instead of the MiniLM models, e.g. "hash" for local runs
+EMBEDDER = os.environ.get("EMBEDDER")
+# `utils.compression` spec for new compact indexes, e.g. "pca:128" or "binary"; unset keeps full vectors
+VECTOR_COMPRESSION = os.environ.get("VECTOR_COMPRESSION")
 
 
 class PineVectorStore:
-    def __init__(self, batch_size=64):
+    """Pinecone index with LangChain search on top.
+
+    Arguments:
+        batch_size: Vectors per upsert request.
+        embedder: An engine from `utils.embedders`; defaults to the mpnet model.
+        index: An index to write to instead of connecting to Pinecone, e.g. the
+            in-process stand-in in `benchmarks.fake_pinecone`. It is only used
+            for bulk loads, since LangChain's wrapper insists on a real index.
+    """
+
+    def __init__(self, batch_size=64, embedder=None, index=None):
         self.batch_size = batch_size
-        self.embedding_engine = self.get_embedding_engine()
-        self.vector_index = self.connect_to_vector_index()
+        self.embedding_engine = embedder or self.get_embedding_engine()
+        self.index = index
+        self.vector_index = self.connect_to_vector_index() if index is None else None
 
     def connect_to_vector_index(self):
         """Adds the texts and metadatas to the vector index."""
@@ -23,8 +40,8 @@ class PineVectorStore:
             api_key=os.environ["PINECONE_API_KEY"],  # find at app.pinecone.io
             environment=os.environ["PINECONE_ENV"]  # next to api key in console
         )
-        index = pinecone.Index(INDEX_NAME)
-        vector_index = Pinecone(index, self.embedding_engine.embed_query, "text")
+        self.index = pinecone.Index(INDEX_NAME)
+        vector_index = Pinecone(self.index, self.embedding_engine.embed_query, "text")
         return vector_index
 
     def get_embedding_engine(self, model="text-embedding-ada-002", **kwargs):
@@ -56,21 +73,78 @@ class PineVectorStore:
         )
         return True
 
+    def add_embedding(self, texts, embeddings, ids, metadatas, concurrency=8, checkpoint=None):
+        """Upserts precomputed embeddings concurrently, instead of re-embedding every text like `add_to_vector`.
+
+        Rerunning with the same `checkpoint` path resumes a failed load; a completed load deletes it.
+        """
+        from .upserts import bulk_upsert
+
+        counts = bulk_upsert(
+            self.index, texts, embeddings, ids, metadatas, batch_size=self.batch_size,
+            concurrency=concurrency, checkpoint=checkpoint,
+        )
+        pretty_log(f"pinecone bulk load: {counts}")
+        if counts["failed"]:
+            raise RuntimeError(f"{counts['failed']} vectors failed to upsert; rerun to resume: {counts['error']}")
+        return counts
+
 
 class FaissVectorStore:
-    def __init__(self, batch_size=64):
+    """FAISS index stored on the shared volume.
+
+    Arguments:
+        batch_size: Batch size used when encoding texts.
+        embedder: An engine from `utils.embedders`; defaults to $EMBEDDER, then the MiniLM models.
+        vector_dir: Directory the index files are read from and written to.
+        index_name: File stem of the index files.
+        compact: Write new indexes with `utils.chunk_store`'s normalized chunk
+            layout rather than LangChain's pickled docstore. Either layout loads.
+        compression: A `utils.compression` spec such as "pca:128" or "binary"
+            for compact indexes; defaults to $VECTOR_COMPRESSION.
+    """
+
+    def __init__(
+        self, batch_size=64, embedder=None, vector_dir=VECTOR_DIR, index_name=INDEX_NAME, compact=True,
+        compression=VECTOR_COMPRESSION,
+    ):
         self.batch_size = batch_size
+        self.vector_dir = Path(vector_dir)
+        self.index_name = index_name
+        self.compact = compact
+        self.compression = compression or None
         self.embedding_engine = None
         self.lang_embedding_engine = None
+        # set inside `encoding_pool`, so repeated `multi_encode_texts` calls share one pool
+        self._pool_lock = None
+        self._pool = None
+
+        if embedder is None and EMBEDDER:
+            from .embedders import get_embedder
 
-        self.get_embedding_engine()
+            embedder = get_embedder(EMBEDDER)
+        if embedder is None:
+            self.get_embedding_engine()
+        else:
+            self.embedding_engine = self.lang_embedding_engine = embedder
         # self.vector_index = self.connect_to_vector_index()
 
-    def connect_to_vector_index(self):
-        """Adds the texts and metadatas to the vector index."""
+    def connect_to_vector_index(self, vector_dir=None):
+        """Loads the vector index from `vector_dir`, by default the store's own directory."""
         from langchain.vectorstores import FAISS
 
-        vector_index = FAISS.load_local(str(VECTOR_DIR), self.lang_embedding_engine, INDEX_NAME)
+        from .chunk_store import CompactFaissIndex, docs_path
+        from .compression import CompressedFaissIndex, compression_path
+        from .sharding import ShardedIndex, shards_manifest_path
+
+        vector_dir = vector_dir or self.vector_dir
+        if shards_manifest_path(vector_dir, self.index_name).exists():
+            return ShardedIndex(vector_dir, self.index_name, self.lang_embedding_engine)
+        if compression_path(vector_dir, self.index_name).exists():
+            return CompressedFaissIndex.load(vector_dir, self.index_name, self.lang_embedding_engine)
+        if docs_path(vector_dir, self.index_name).exists():
+            return CompactFaissIndex.load(vector_dir, self.index_name, self.lang_embedding_engine)
+        vector_index = FAISS.load_local(str(vector_dir), self.lang_embedding_engine, self.index_name)
 
         return vector_index
 
@@ -100,20 +174,62 @@ class FaissVectorStore:
         self.save_local_index(index)
         return index
 
-    @staticmethod
-    def save_local_index(index):
-        index.save_local(folder_path=str(VECTOR_DIR), index_name=INDEX_NAME)
-        pretty_log(f"vector store {INDEX_NAME} saved")
+    def save_local_index(self, index):
+        index.save_local(folder_path=str(self.vector_dir), index_name=self.index_name)
+        pretty_log(f"vector store {self.index_name} saved")
 
-    @staticmethod
-    def wipe_index():
-        files = VECTOR_DIR.glob(f"{INDEX_NAME}.*")
+    def index_files(self):
+        """The files of this index, including any shards."""
+        return [*self.vector_dir.glob(f"{self.index_name}.*"), *self.vector_dir.glob(f"{self.index_name}-shard*")]
+
+    def wipe_index(self):
+        files = self.index_files()
         if files:
             for file in files:
                 file.unlink()
             pretty_log("existing index wiped")
 
+    def bill_index_path(self, vector_dir=None):
+        """Where the structured bill index built alongside this vector index lives."""
+        return Path(vector_dir or self.vector_dir) / f"{self.index_name}.bills.json"
+
+    def index_size_bytes(self):
+        return sum(file.stat().st_size for file in self.index_files())
+
+    @contextlib.contextmanager
+    def encoding_pool(self):
+        """Keeps the multi-process pool `multi_encode_texts` starts running until the block exits.
+
+        Without it every call starts a pool on all CUDA devices, loading the
+        model in each worker, and stops it again. The pool is only started if
+        something is encoded.
+        """
+        self._pool_lock = threading.Lock()
+        try:
+            yield self
+        finally:
+            with self._pool_lock:
+                pool, self._pool = self._pool, None
+                self._pool_lock = None
+            if pool is not None:
+                self.embedding_engine.stop_multi_process_pool(pool)
+
     def multi_encode_texts(self, texts):
+        if not hasattr(self.embedding_engine, "start_multi_process_pool"):
+            # engines from utils.embedders encode in-process
+            emb = self.embedding_engine.encode(texts, batch_size=self.batch_size)
+            pretty_log(f"Embeddings computed. Shape: {emb.shape}")
+            return emb.tolist()
+
+        pool_lock = self._pool_lock
+        if pool_lock is not None:
+            with pool_lock:
+                if self._pool is None:
+                    self._pool = self.embedding_engine.start_multi_process_pool()
+                emb = self.embedding_engine.encode_multi_process(texts, self._pool)
+            pretty_log(f"Embeddings computed. Shape: {emb.shape}")
+            return emb.tolist()
+
         # Start the multi-process pool on all available CUDA devices
         pool = self.embedding_engine.start_multi_process_pool()
 
@@ -125,10 +241,35 @@ class FaissVectorStore:
         self.embedding_engine.stop_multi_process_pool(pool)
         return emb.tolist()
 
+    def add_sharded_embedding(self, texts, embeddings, ids, metadatas, n_shards):
+        """Builds the index as `n_shards` shards partitioned by document, in parallel."""
+        from .sharding import build_sharded_index
+
+        self.wipe_index()
+        chunk_counts = build_sharded_index(self.vector_dir, self.index_name, texts, embeddings, ids, metadatas, n_shards)
+        pretty_log(f"vector store {self.index_name} saved as {n_shards} shards: {chunk_counts}")
+        return chunk_counts
+
     def add_embedding(self, texts, embeddings, ids, metadatas):
         from langchain import FAISS
 
+        if len(set(ids)) != len(ids):
+            # FAISS.from_embeddings keeps one docstore entry per id, so duplicates would serve the wrong chunk
+            raise ValueError("chunk ids must be unique; re-split the corpus with chunking.split_document")
         self.wipe_index()  # If index already exists, wipe it
+        if self.compact:
+            from .chunk_store import CompactFaissIndex
+            from .compression import CompressedFaissIndex
+
+            if self.compression:
+                index = CompressedFaissIndex.build(
+                    texts, embeddings, ids, metadatas, self.lang_embedding_engine, self.compression
+                )
+            else:
+                index = CompactFaissIndex.build(texts, embeddings, ids, metadatas, self.lang_embedding_engine)
+            index.save(self.vector_dir, self.index_name)
+            pretty_log(f"vector store {self.index_name} saved with {len(index.store.doc_ids)} documents")
+            return index
         text_embedding_pairs = list(zip(texts, embeddings))
         index = FAISS.from_embeddings(
             text_embeddings=text_embedding_pairs, embedding=self.lang_embedding_engine, metadatas=metadatas, ids=ids